@@ -2,14 +2,14 @@ from typing import Any
 from fastapi import Depends, HTTPException
 from fastapi.security import OAuth2PasswordBearer
 from sqlmodel import Session, select
-from auth.jwt import decode_access_token
+from auth.jwt import validate_access_token
 from db.database import get_session
 from models.user import User
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login")
 
-def get_current_user(token: str = Depends(oauth2_scheme)):
-    payload = decode_access_token(token)
+async def get_current_user(token: str = Depends(oauth2_scheme)):
+    payload = await validate_access_token(token)
     if not payload:
         raise HTTPException(status_code=401, detail="Invalid or expired token")
     return payload
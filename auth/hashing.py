@@ -1,7 +1,27 @@
+import os
 from bcrypt import hashpw, gensalt, checkpw
+from utils.process_pool import BoundedProcessPool
+
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+# Empty or unset means one worker per CPU
+HASHING_WORKERS = int(os.getenv("HASHING_WORKERS") or os.cpu_count() or 1)
+# Hashes queued or running before new requests get a 503
+HASHING_MAX_PENDING = int(os.getenv("HASHING_MAX_PENDING", "64"))
+
+hashing_pool = BoundedProcessPool("hashing", HASHING_WORKERS, HASHING_MAX_PENDING)
 
 def hash_password(password: str) -> str:
-    return hashpw(password.encode('utf-8'), gensalt()).decode('utf-8')
+    return hashpw(password.encode('utf-8'), gensalt(rounds=BCRYPT_ROUNDS)).decode('utf-8')
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return checkpw(plain_password.encode('utf-8'), hashed_password.encode('utf-8'))
+
+async def hash_password_async(password: str) -> str:
+    return await hashing_pool.run(hash_password, password)
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    return await hashing_pool.run(verify_password, plain_password, hashed_password)
+
+def hash_passwords(passwords: list[str]) -> list[str]:
+    """Hash many passwords in parallel through the hashing pool, for bulk jobs."""
+    return hashing_pool.map(hash_password, passwords, chunksize=max(1, len(passwords) // (HASHING_WORKERS * 4)))
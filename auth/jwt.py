@@ -1,7 +1,11 @@
 import os
+import time
+import uuid
+from collections import OrderedDict
 from datetime import datetime, timedelta, timezone
-from jose import jwt, ExpiredSignatureError
-from auth.redis_client import redis_update_token
+from jose import jwt, ExpiredSignatureError, JWTError
+from auth.redis_client import redis_update_tokens
+from auth.revocation import revocation_list
 from log.logger import logger
 
 ACCESS_SECRET_KEY = os.getenv("SECRET_KEY", "your_secret_key")
@@ -9,12 +13,21 @@ REFRESH_SECRET_KEY = os.getenv("REFRESH_SECRET_KEY", "your_refresh_secret_key")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 10
 REFRESH_TOKEN_EXPIRE_DAYS = 1
+# Decoded access tokens kept per worker, so repeated requests skip the signature check
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", "10000"))
 
 def _get_jti(sub: str, exp: datetime) -> str:
-    """Generate a unique JWT ID using subject and expiration timestamp."""
-    return f"{sub}_{int(exp.timestamp())}"
+    """Generate a unique JWT ID using subject, expiration timestamp and a random suffix.
 
-def create_access_token(data: dict, role: str):
+    The suffix keeps two tokens issued in the same second apart, so revoking one
+    doesn't revoke the other.
+    """
+    return f"{sub}_{int(exp.timestamp())}_{uuid.uuid4().hex[:12]}"
+
+# Token encoding is pure; the Redis bookkeeping is awaited by the async helpers below,
+# batching every write of a request into one pipelined round-trip
+
+def _encode_access_token(data: dict, role: str) -> tuple[str, tuple]:
     to_encode = data.copy()
     expire = datetime.now(timezone.utc) + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     jti = _get_jti(data.get("sub", "unknown"), expire)
@@ -24,10 +37,10 @@ def create_access_token(data: dict, role: str):
         "jti": jti
     })
     ttl = int(timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES).total_seconds())
-    redis_update_token("access", jti, ttl, f"Validity: {ACCESS_TOKEN_EXPIRE_MINUTES} minutes")
-    return jwt.encode(to_encode, ACCESS_SECRET_KEY, algorithm=ALGORITHM)
+    entry = ("access", jti, ttl, f"Validity: {ACCESS_TOKEN_EXPIRE_MINUTES} minutes")
+    return jwt.encode(to_encode, ACCESS_SECRET_KEY, algorithm=ALGORITHM), entry
 
-def create_refresh_token(data: dict):
+def _encode_refresh_token(data: dict) -> tuple[str, tuple]:
     to_encode = data.copy()
     expire = datetime.now(timezone.utc) + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS)
     jti = _get_jti(data.get("sub", "unknown"), expire)
@@ -36,9 +49,26 @@ def create_refresh_token(data: dict):
         "jti": jti
     })
     ttl = int(timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS).total_seconds())
-    redis_update_token("refresh", jti, ttl, f"Validity: {REFRESH_TOKEN_EXPIRE_DAYS} days")
-    return jwt.encode(to_encode, REFRESH_SECRET_KEY, algorithm=ALGORITHM)
-    
+    entry = ("refresh", jti, ttl, f"Validity: {REFRESH_TOKEN_EXPIRE_DAYS} days")
+    return jwt.encode(to_encode, REFRESH_SECRET_KEY, algorithm=ALGORITHM), entry
+
+async def create_access_token(data: dict, role: str) -> str:
+    token, entry = _encode_access_token(data, role)
+    await redis_update_tokens([entry])
+    return token
+
+async def create_refresh_token(data: dict) -> str:
+    token, entry = _encode_refresh_token(data)
+    await redis_update_tokens([entry])
+    return token
+
+async def create_token_pair(access_data: dict, refresh_data: dict, role: str) -> tuple[str, str]:
+    """Issue an access and a refresh token, storing both in one Redis round-trip."""
+    access_token, access_entry = _encode_access_token(access_data, role)
+    refresh_token, refresh_entry = _encode_refresh_token(refresh_data)
+    await redis_update_tokens([access_entry, refresh_entry])
+    return access_token, refresh_token
+
 def decode_access_token(token: str):
     try:
         return jwt.decode(token, ACCESS_SECRET_KEY, algorithms=[ALGORITHM])
@@ -53,13 +83,80 @@ def decode_refresh_token(token: str):
         logger.info(f"Attempted use of expired token: {token}")
         return None
     
-def revoke_token(token: str, token_type: str):
+def _revocation_entry(token: str, token_type: str) -> tuple | None:
     try:
         key = REFRESH_SECRET_KEY if token_type == "refresh" else ACCESS_SECRET_KEY
         payload = jwt.decode(token, key, algorithms=[ALGORITHM])
         jti = payload.get("jti")
         exp = payload.get("exp") # Check if token is supposed to expire
         if jti and exp:
-            redis_update_token(token_type, jti, 5, "Validity: Revoked")
+            return (token_type, jti, exp)
     except ExpiredSignatureError:
         logger.info(f"Revoke attempt of already expired token: {token}")
+    return None
+
+async def revoke_tokens(tokens: list[tuple[str, str]]):
+    """Revoke several (token, token_type) pairs in one Redis round-trip."""
+    entries = [entry for entry in (_revocation_entry(token, token_type) for token, token_type in tokens) if entry]
+    if entries:
+        await revocation_list.revoke(entries)
+
+async def revoke_token(token: str, token_type: str):
+    await revoke_tokens([(token, token_type)])
+
+class DecodedTokenCache:
+    """LRU of decoded access tokens. Entries are only served until the token's exp."""
+
+    def __init__(self, max_size: int = TOKEN_CACHE_SIZE):
+        self.max_size = max_size
+        self._entries: OrderedDict[str, dict] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, token: str) -> dict | None:
+        payload = self._entries.get(token)
+        if payload is None:
+            self.misses += 1
+            return None
+        if payload.get("exp", 0) <= time.time():
+            del self._entries[token]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(token)
+        self.hits += 1
+        return payload
+
+    def put(self, token: str, payload: dict):
+        self._entries[token] = payload
+        self._entries.move_to_end(token)
+        if len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def stats(self) -> dict:
+        return {"size": len(self._entries), "max_size": self.max_size, "hits": self.hits, "misses": self.misses}
+
+_decoded_tokens = DecodedTokenCache()
+
+async def validate_access_token(token: str) -> dict | None:
+    """Decode an access token and reject it if expired, malformed or revoked.
+
+    Both steps are normally served from process memory, see DecodedTokenCache
+    and RevocationList.
+    """
+    payload = _decoded_tokens.get(token)
+    if payload is None:
+        try:
+            payload = decode_access_token(token)
+        except JWTError:
+            return None
+        if not payload:
+            return None
+        _decoded_tokens.put(token, payload)
+
+    jti = payload.get("jti")
+    if jti and await revocation_list.is_revoked(jti):
+        return None
+    return payload
+
+def token_validation_stats() -> dict:
+    return {"decoded_tokens": _decoded_tokens.stats(), "revocations": revocation_list.stats()}
@@ -1,11 +1,147 @@
-import redis
+import os
+import time
+from contextlib import asynccontextmanager
+from typing import Optional
+import redis as sync_redis
+import redis.asyncio as redis
+from redis.asyncio.retry import Retry
+from redis.backoff import ExponentialBackoff
+from redis.exceptions import ConnectionError, RedisError, TimeoutError
+from log.logger import logger
+from utils.metrics import redis_command_duration
 
-# Conexión simple, ajusta según configuración real
-r = redis.Redis(host="127.0.0.1", port=6379, db=0, decode_responses=True)
+REDIS_HOST = os.getenv("REDIS_HOST", "127.0.0.1")
+REDIS_PORT = int(os.getenv("REDIS_PORT", "6379"))
+REDIS_DB = int(os.getenv("REDIS_DB", "0"))
+REDIS_PASSWORD = os.getenv("REDIS_PASSWORD") or None
+REDIS_MAX_CONNECTIONS = int(os.getenv("REDIS_MAX_CONNECTIONS", "50"))
+# Seconds. Kept short so a Redis outage fails fast instead of stalling logins
+REDIS_CONNECT_TIMEOUT = float(os.getenv("REDIS_CONNECT_TIMEOUT", "1"))
+REDIS_SOCKET_TIMEOUT = float(os.getenv("REDIS_SOCKET_TIMEOUT", "1"))
+# Reconnect attempts per command, with exponential backoff between REDIS_BACKOFF_BASE and REDIS_BACKOFF_CAP seconds
+REDIS_RETRIES = int(os.getenv("REDIS_RETRIES", "2"))
+REDIS_BACKOFF_BASE = float(os.getenv("REDIS_BACKOFF_BASE", "0.05"))
+REDIS_BACKOFF_CAP = float(os.getenv("REDIS_BACKOFF_CAP", "0.5"))
 
-def redis_update_token(token_type: str, jti: str, ttl: int, status: str):
-    """Store token in Redis until expiration (TTL)"""
+_client: Optional[redis.Redis] = None
+_sync_client: Optional[sync_redis.Redis] = None
+
+def _build_client() -> redis.Redis:
+    pool = redis.ConnectionPool(
+        host=REDIS_HOST,
+        port=REDIS_PORT,
+        db=REDIS_DB,
+        password=REDIS_PASSWORD,
+        decode_responses=True,
+        max_connections=REDIS_MAX_CONNECTIONS,
+        socket_connect_timeout=REDIS_CONNECT_TIMEOUT,
+        socket_timeout=REDIS_SOCKET_TIMEOUT,
+        retry=Retry(ExponentialBackoff(cap=REDIS_BACKOFF_CAP, base=REDIS_BACKOFF_BASE), REDIS_RETRIES),
+        retry_on_error=[ConnectionError, TimeoutError],
+        health_check_interval=30,
+    )
+    return redis.Redis(connection_pool=pool)
+
+async def start_redis() -> redis.Redis:
+    """Create the shared, pooled Redis client. Called once at app startup."""
+    return get_redis()
+
+async def close_redis():
+    global _client
+    if _client is not None:
+        await _client.aclose(close_connection_pool=True)
+        _client = None
+
+def get_redis() -> redis.Redis:
+    # Scripts that never ran the app lifespan still get a working client
+    global _client
+    if _client is None:
+        _client = _build_client()
+    return _client
+
+def get_sync_redis() -> sync_redis.Redis:
+    """Blocking client with the same settings, for scripts and sync CRUD functions only."""
+    global _sync_client
+    if _sync_client is None:
+        _sync_client = sync_redis.Redis(
+            host=REDIS_HOST,
+            port=REDIS_PORT,
+            db=REDIS_DB,
+            password=REDIS_PASSWORD,
+            decode_responses=True,
+            socket_connect_timeout=REDIS_CONNECT_TIMEOUT,
+            socket_timeout=REDIS_SOCKET_TIMEOUT,
+        )
+    return _sync_client
+
+class RedisStats:
+    """Latency and error counters per Redis operation."""
+
+    def __init__(self):
+        self._ops: dict[str, dict] = {}
+
+    def record(self, operation: str, elapsed_ms: float, error: bool = False):
+        op = self._ops.setdefault(operation, {"calls": 0, "errors": 0, "total_ms": 0.0, "max_ms": 0.0})
+        op["calls"] += 1
+        op["errors"] += error
+        op["total_ms"] += elapsed_ms
+        op["max_ms"] = max(op["max_ms"], elapsed_ms)
+
+    def snapshot(self) -> dict:
+        return {
+            name: {
+                "calls": op["calls"],
+                "errors": op["errors"],
+                "avg_ms": round(op["total_ms"] / (op["calls"] or 1), 3),
+                "max_ms": round(op["max_ms"], 3),
+            }
+            for name, op in self._ops.items()
+        }
+
+redis_stats = RedisStats()
+
+@asynccontextmanager
+async def timed(operation: str):
+    start = time.perf_counter()
+    error = False
     try:
-        r.setex(f"{token_type}:{jti}", ttl, f"{status}")
-    except redis.ConnectionError as e:
-        print(f"Redis connection error: {e}")
\ No newline at end of file
+        yield
+    except RedisError:
+        error = True
+        raise
+    finally:
+        elapsed = time.perf_counter() - start
+        redis_stats.record(operation, elapsed * 1000, error)
+        redis_command_duration.observe(elapsed, operation, "error" if error else "ok")
+
+async def redis_update_tokens(entries: list[tuple[str, str, int, str]]):
+    """Store several tokens in Redis until expiration (TTL), in one round-trip.
+
+    Each entry is (token_type, jti, ttl, status). Token bookkeeping is best
+    effort: a Redis failure is logged and never fails the request.
+    """
+    try:
+        async with timed("update_tokens"):
+            async with get_redis().pipeline(transaction=False) as pipe:
+                for token_type, jti, ttl, status in entries:
+                    pipe.setex(f"{token_type}:{jti}", ttl, status)
+                await pipe.execute()
+    except RedisError as e:
+        logger.warning(f"Redis error while storing tokens: {e}")
+
+async def redis_update_token(token_type: str, jti: str, ttl: int, status: str):
+    """Store token in Redis until expiration (TTL)"""
+    await redis_update_tokens([(token_type, jti, ttl, status)])
+
+def redis_status() -> dict:
+    client = get_redis()
+    pool = client.connection_pool
+    return {
+        "host": REDIS_HOST,
+        "port": REDIS_PORT,
+        "db": REDIS_DB,
+        "max_connections": pool.max_connections,
+        "in_use_connections": len(pool._in_use_connections),
+        "available_connections": len(pool._available_connections),
+        "operations": redis_stats.snapshot(),
+    }
@@ -0,0 +1,173 @@
+import asyncio
+import os
+import time
+from typing import Optional
+from redis.exceptions import RedisError
+from auth.redis_client import get_redis, timed
+from log.logger import logger
+
+TOKEN_REVOCATION_CHANNEL = os.getenv("TOKEN_REVOCATION_CHANNEL", "token-revocations")
+# Seconds a Redis lookup is trusted while this worker is not subscribed to revocations
+TOKEN_REVOCATION_RECHECK = float(os.getenv("TOKEN_REVOCATION_RECHECK", "5"))
+REVOKED_PREFIX = "revoked:"
+
+class RevocationList:
+    """Process-local denylist of revoked token ids (jti), kept coherent through Redis.
+
+    Revocations are stored as `revoked:<jti>` keys that live as long as the
+    token would have, and published on TOKEN_REVOCATION_CHANNEL. Each worker
+    runs a listener that loads the existing keys and then applies published
+    revocations, so checking a token is a dict lookup. While the listener is
+    not subscribed (startup, Redis outage, scripts without the app lifespan)
+    tokens are checked against Redis and the answer is reused for
+    TOKEN_REVOCATION_RECHECK seconds. If Redis cannot be reached at all,
+    tokens are accepted: revocation is best effort, like the rest of the
+    token bookkeeping.
+    """
+
+    def __init__(self, channel: str = TOKEN_REVOCATION_CHANNEL, recheck: float = TOKEN_REVOCATION_RECHECK):
+        self.channel = channel
+        self.recheck = recheck
+        # jti -> exp timestamp, entries are dropped once the token has expired anyway
+        self._revoked: dict[str, float] = {}
+        # jti -> time of the last Redis lookup that found it not revoked
+        self._checked: dict[str, float] = {}
+        self._listener: Optional[asyncio.Task] = None
+        self.subscribed = False
+        self.local_checks = 0
+        self.redis_checks = 0
+        self.messages = 0
+        self.resyncs = 0
+
+    def _add(self, jti: str, exp: float):
+        self._revoked[jti] = exp
+        self._checked.pop(jti, None)
+
+    def _prune(self):
+        now = time.time()
+        for jti in [jti for jti, exp in self._revoked.items() if exp <= now]:
+            del self._revoked[jti]
+        for jti in [jti for jti, checked_at in self._checked.items() if now - checked_at > self.recheck]:
+            del self._checked[jti]
+
+    async def is_revoked(self, jti: str) -> bool:
+        if jti in self._revoked:
+            return True
+        if self.subscribed:
+            self.local_checks += 1
+            return False
+
+        checked_at = self._checked.get(jti)
+        if checked_at is not None and time.time() - checked_at <= self.recheck:
+            self.local_checks += 1
+            return False
+        self.redis_checks += 1
+        try:
+            async with timed("revocation_check"):
+                exp = await get_redis().get(f"{REVOKED_PREFIX}{jti}")
+        except RedisError as e:
+            logger.warning(f"Redis error while checking token revocation: {e}")
+            return False
+        if exp is not None:
+            self._add(jti, float(exp))
+            return True
+        self._checked[jti] = time.time()
+        return False
+
+    async def revoke(self, entries: list[tuple[str, str, float]]):
+        """Revoke (token_type, jti, exp) entries here, in Redis and in every other worker.
+
+        Everything goes out in one pipelined round-trip. Keys expire together
+        with the token they revoke.
+        """
+        now = time.time()
+        for _, jti, exp in entries:
+            self._add(jti, exp)
+        try:
+            async with timed("revoke_tokens"):
+                async with get_redis().pipeline(transaction=False) as pipe:
+                    for token_type, jti, exp in entries:
+                        ttl = max(1, int(exp - now))
+                        pipe.setex(f"{token_type}:{jti}", ttl, "Validity: Revoked")
+                        pipe.setex(f"{REVOKED_PREFIX}{jti}", ttl, str(exp))
+                        pipe.publish(self.channel, f"{jti} {exp}")
+                    await pipe.execute()
+        except RedisError as e:
+            logger.warning(f"Redis error while revoking tokens: {e}")
+
+    async def _load(self):
+        redis = get_redis()
+        keys = [key async for key in redis.scan_iter(match=f"{REVOKED_PREFIX}*", count=1000)]
+        if keys:
+            for key, exp in zip(keys, await redis.mget(keys)):
+                if exp is None:
+                    continue
+                try:
+                    self._add(key[len(REVOKED_PREFIX):], float(exp))
+                except ValueError:
+                    logger.warning(f"Ignoring malformed revocation key {key}: {exp!r}")
+        self.resyncs += 1
+
+    def _apply(self, data):
+        """Applies one published `<jti> <exp>` message, skipping malformed ones."""
+        try:
+            jti, exp = data.rsplit(" ", 1)
+            self._add(jti, float(exp))
+        except (AttributeError, TypeError, ValueError):
+            logger.warning(f"Ignoring malformed token revocation message: {data!r}")
+            return
+        self.messages += 1
+
+    async def _listen(self):
+        backoff = 0.1
+        try:
+            while True:
+                try:
+                    async with get_redis().pubsub() as pubsub:
+                        await pubsub.subscribe(self.channel)
+                        # Subscribe before loading so nothing revoked in between is missed
+                        await self._load()
+                        self.subscribed = True
+                        backoff = 0.1
+                        while True:
+                            message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+                            if message is not None:
+                                self._apply(message["data"])
+                            self._prune()
+                except asyncio.CancelledError:
+                    raise
+                except (RedisError, OSError) as e:
+                    if self.subscribed:
+                        logger.warning(f"Lost token revocation subscription: {e}")
+                    self.subscribed = False
+                    await asyncio.sleep(backoff)
+                    backoff = min(backoff * 2, 5.0)
+        finally:
+            # Whatever ended the listener, is_revoked must go back to asking Redis
+            self.subscribed = False
+
+    async def start(self):
+        if self._listener is None:
+            self._listener = asyncio.create_task(self._listen())
+
+    async def stop(self):
+        if self._listener is not None:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
+        self.subscribed = False
+
+    def stats(self) -> dict:
+        return {
+            "subscribed": self.subscribed,
+            "revoked": len(self._revoked),
+            "local_checks": self.local_checks,
+            "redis_checks": self.redis_checks,
+            "messages": self.messages,
+            "resyncs": self.resyncs,
+        }
+
+revocation_list = RevocationList()
@@ -0,0 +1,43 @@
+from sqlalchemy import text
+from db.database import engine
+from crud.order import order_totals_sql
+import argparse
+import sys
+import time
+
+# The columns and their indexes belong to migration 0002, this script only fills them
+REQUIRED_COLUMNS = {"item_count", "total"}
+
+# One id range per transaction keeps row locks short on a live table
+BACKFILL_BATCH = f"""
+UPDATE "order" o SET (item_count, total) = ({order_totals_sql("CASE WHEN jsonb_typeof(o.products) = 'array' THEN o.products ELSE '[]'::jsonb END")})
+WHERE o.id >= :start AND o.id < :end
+"""
+
+def missing_columns(connection) -> set[str]:
+    present = connection.execute(text(
+        "SELECT column_name FROM information_schema.columns WHERE table_schema = current_schema() AND table_name = 'order'"
+    )).scalars().all()
+    return REQUIRED_COLUMNS - set(present)
+
+def backfill_order_totals(batch_size=5000):
+    with engine.begin() as connection:
+        missing = missing_columns(connection)
+        if missing:
+            sys.exit(f"Missing order columns: {', '.join(sorted(missing))}. Run `alembic upgrade head` first.")
+        max_id = connection.execute(text('SELECT coalesce(max(id), 0) FROM "order"')).scalar()
+
+    updated = 0
+    started = time.perf_counter()
+    for start in range(0, max_id + 1, batch_size):
+        with engine.begin() as connection:
+            updated += connection.execute(text(BACKFILL_BATCH), {"start": start, "end": start + batch_size}).rowcount
+        print(f"Orders up to ID {min(start + batch_size - 1, max_id)}: {updated} updated")
+
+    print(f"Order totals backfilled for {updated} orders in {time.perf_counter() - started:.1f}s")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fill Order.item_count and Order.total for existing orders. Run `alembic upgrade head` first.")
+    parser.add_argument('--batch-size', type=int, default=5000, help='Orders updated per transaction.')
+    args = parser.parse_args()
+    backfill_order_totals(args.batch_size)
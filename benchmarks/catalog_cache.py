@@ -0,0 +1,45 @@
+"""Fire concurrent catalog lookups against the local stand-in and report how
+many upstream requests were made.
+
+    python -m benchmarks.catalog_cache --concurrency 500
+"""
+import argparse
+import asyncio
+import json
+import time
+from benchmarks.fake_catalog import FakeCatalogServer
+
+async def run(concurrency: int, products: int, latency: float):
+    server = FakeCatalogServer(products=products, latency=latency).start()
+    try:
+        from utils import api_client
+        api_client.PRODUCTS_API_URL = server.url
+        cache = api_client.CatalogCache()
+        await api_client.start_client()
+
+        start = time.perf_counter()
+        await asyncio.gather(*(cache.get() for _ in range(concurrency)))
+        cold = time.perf_counter() - start
+
+        start = time.perf_counter()
+        await asyncio.gather(*(cache.get() for _ in range(concurrency)))
+        warm = time.perf_counter() - start
+
+        await api_client.close_client()
+        return {
+            "concurrency": concurrency,
+            "upstream_requests": server.requests,
+            "cold_seconds": round(cold, 4),
+            "warm_seconds": round(warm, 4),
+            "cache": cache.stats(),
+        }
+    finally:
+        server.stop()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--concurrency", type=int, default=500)
+    parser.add_argument("--products", type=int, default=1000)
+    parser.add_argument("--latency", type=float, default=0.05)
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(run(args.concurrency, args.products, args.latency)), indent=2))
@@ -0,0 +1,76 @@
+"""Compare product filtering through CatalogIndex against the previous
+list-comprehension path of routes/product.get_all_products.
+
+    python -m benchmarks.catalog_index --products 100000
+"""
+import argparse
+import json
+import time
+from benchmarks.fake_catalog import generate_products
+from utils.catalog_index import CatalogIndex
+
+QUERIES = {
+    "category": {"category": "laptops"},
+    "brand+tag": {"brand": "Apple", "tag": "electronics"},
+    "price_range": {"min_price": 100, "max_price": 120},
+    "title": {"title": "item 4242"},
+    "category+price+sort": {"category": "tablets", "min_price": 500, "max_price": 900, "sort_by": "price"},
+    "sorted_page": {"sort_by": "price", "sort_order": "desc", "skip": 0, "limit": 20},
+    "id": {"id": 77777},
+}
+
+def legacy_search(products, id=None, title=None, min_price=None, max_price=None, category=None, tag=None,
+                  brand=None, sort_by=None, sort_order=None, skip=None, limit=None):
+    # Filtering as it was done before the index, with pagination moved after filtering
+    filtered = products
+    if title:
+        filtered = [p for p in filtered if title.lower() in p.get("title", "").lower()]
+    if category:
+        filtered = [p for p in filtered if p.get("category", "").lower() == category.lower()]
+    if tag:
+        filtered = [p for p in filtered if tag.lower() in [t.lower() for t in p.get("tags", [])]]
+    if brand:
+        filtered = [p for p in filtered if p.get("brand", "").lower() == brand.lower()]
+    if min_price is not None:
+        filtered = [p for p in filtered if isinstance(p.get("price"), (int, float)) and p["price"] >= min_price]
+    if max_price is not None:
+        filtered = [p for p in filtered if isinstance(p.get("price"), (int, float)) and p["price"] <= max_price]
+    if sort_by:
+        filtered = sorted(filtered, key=lambda p: p.get(sort_by, 0), reverse=sort_order == "desc")
+    if id:
+        filtered = [p for p in filtered if p.get("id") == id]
+    start = skip or 0
+    return filtered[start:start + limit if limit is not None else None]
+
+def timeit(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+def run(count: int, repeat: int):
+    products = generate_products(count)
+    start = time.perf_counter()
+    index = CatalogIndex(products)
+    build_ms = (time.perf_counter() - start) * 1000
+
+    results = {"products": count, "index_build_ms": round(build_ms, 1), "queries": {}}
+    for name, query in QUERIES.items():
+        expected = legacy_search(products, **query)
+        actual = index.search(**query)
+        assert [p["id"] for p in expected] == [p["id"] for p in actual], name
+        results["queries"][name] = {
+            "matches": len(actual),
+            "legacy_ms": round(timeit(lambda: legacy_search(products, **query), repeat), 3),
+            "index_ms": round(timeit(lambda: index.search(**query), repeat), 3),
+        }
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--products", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    print(json.dumps(run(args.products, args.repeat), indent=2))
@@ -0,0 +1,54 @@
+"""Compare two benchmarks.load results, e.g. before and after a change.
+
+Prints the relative change of throughput and p50/p95/p99 per scenario and
+exits 1 when any scenario got slower than --tolerance allows:
+
+    python -m benchmarks.compare before.json after.json --tolerance 0.10
+"""
+import argparse
+import json
+import sys
+
+LATENCY_METRICS = ("p50_ms", "p95_ms", "p99_ms")
+
+def change(before: float, after: float) -> float | None:
+    return round((after - before) / before, 3) if before else None
+
+def compare(baseline: dict, results: dict, tolerance: float) -> tuple[dict, list[str]]:
+    deltas = {}
+    found = []
+    for scenario, current in results["scenarios"].items():
+        previous = baseline["scenarios"].get(scenario)
+        if not previous:
+            continue
+        delta = {"throughput_rps": change(previous["throughput_rps"], current["throughput_rps"])}
+        for metric in LATENCY_METRICS:
+            delta[metric] = change(previous[metric], current[metric])
+        deltas[scenario] = delta
+
+        if current["throughput_rps"] < previous["throughput_rps"] * (1 - tolerance):
+            found.append(f"{scenario}: throughput_rps {previous['throughput_rps']} -> {current['throughput_rps']}")
+        # p50 moves with noise too, only the tail latencies gate
+        for metric in ("p95_ms", "p99_ms"):
+            if current[metric] > previous[metric] * (1 + tolerance):
+                found.append(f"{scenario}: {metric} {previous[metric]} -> {current[metric]}")
+        if current["errors"] > previous["errors"]:
+            found.append(f"{scenario}: errors {previous['errors']} -> {current['errors']}")
+    return deltas, found
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("baseline", help="Earlier benchmarks.load --output file")
+    parser.add_argument("results", help="benchmarks.load --output file to check")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="Allowed relative slowdown before failing")
+    args = parser.parse_args()
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.results) as f:
+        results = json.load(f)
+    deltas, found = compare(baseline, results, args.tolerance)
+    print(json.dumps({"baseline": baseline["meta"].get("commit"), "results": results["meta"].get("commit"), "changes": deltas}, indent=2))
+    for line in found:
+        print(f"REGRESSION {line}", file=sys.stderr)
+    sys.exit(1 if found else 0)
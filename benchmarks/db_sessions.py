@@ -0,0 +1,77 @@
+"""Compare throughput and latency of the sync (threadpool) and async database
+paths under high concurrency. Needs the Postgres configured through the DB_*
+environment variables and a seeded database (python seeder.py).
+
+    python -m benchmarks.db_sessions --requests 5000 --concurrency 200
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+import httpx
+from fastapi import Depends, FastAPI
+from sqlmodel import Session
+from sqlmodel.ext.asyncio.session import AsyncSession
+from crud.user import get_all_users_wp, get_all_users_wp_async
+from db.database import async_engine, engine, get_session, get_sync_session
+from models.order import Order  # noqa: F401, registers the mappers User relates to
+from models.status import Status  # noqa: F401
+
+app = FastAPI()
+
+@app.get("/sync")
+def read_sync(session: Session = Depends(get_sync_session)):
+    return len(get_all_users_wp(session, 0, 10))
+
+@app.get("/async")
+async def read_async(session: AsyncSession = Depends(get_session)):
+    return len(await get_all_users_wp_async(session, 0, 10))
+
+def percentile(values: list[float], pct: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+async def drive(client: httpx.AsyncClient, path: str, total: int, concurrency: int) -> dict:
+    latencies = []
+    queue = iter(range(total))
+
+    async def worker():
+        for _ in queue:
+            start = time.perf_counter()
+            response = await client.get(path)
+            response.raise_for_status()
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    return {
+        "requests": total,
+        "concurrency": concurrency,
+        "throughput_rps": round(total / elapsed, 1),
+        "p50_ms": round(statistics.median(latencies), 2),
+        "p99_ms": round(percentile(latencies, 99), 2),
+        "max_ms": round(max(latencies), 2),
+    }
+
+async def run(total: int, concurrency: int) -> dict:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        # Warm both pools before measuring
+        await drive(client, "/sync", 50, 10)
+        await drive(client, "/async", 50, 10)
+        results = {
+            "sync": await drive(client, "/sync", total, concurrency),
+            "async": await drive(client, "/async", total, concurrency),
+        }
+    await async_engine.dispose()
+    engine.dispose()
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=200)
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(run(args.requests, args.concurrency)), indent=2))
@@ -0,0 +1,92 @@
+"""Local stand-in for the dummyjson products API.
+
+Serves a generated catalog at /products so the API, benchmarks and manual
+tests can run without network access:
+
+    python -m benchmarks.fake_catalog --port 8100 --products 1000
+    PRODUCTS_API_URL=http://127.0.0.1:8100/products python main.py
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+CATEGORIES = ["beauty", "fragrances", "furniture", "groceries", "laptops", "smartphones", "tablets", "tops"]
+BRANDS = ["Essence", "Glamour Beauty", "Velvet Touch", "Chic Cosmetics", "Nail Couture", "Calvin Klein", "Chanel", "Dior", "Apple", "Samsung"]
+TAGS = ["beauty", "mascara", "eyeshadow", "face powder", "lipstick", "nail polish", "fragrances", "perfumes", "furniture", "electronics"]
+
+def generate_products(count: int, seed: int = 42) -> list[dict]:
+    rng = random.Random(seed)
+    products = []
+    for i in range(1, count + 1):
+        category = rng.choice(CATEGORIES)
+        products.append({
+            "id": i,
+            "title": f"{rng.choice(BRANDS)} {category.title()} Item {i}",
+            "description": f"Generated product {i}",
+            "category": category,
+            "price": round(rng.uniform(1, 2000), 2),
+            "discountPercentage": round(rng.uniform(0, 20), 2),
+            "rating": round(rng.uniform(1, 5), 2),
+            "stock": rng.randint(0, 500),
+            "tags": rng.sample(TAGS, k=rng.randint(1, 3)),
+            "brand": rng.choice(BRANDS),
+        })
+    return products
+
+class FakeCatalogServer:
+    """Threaded HTTP server that counts how many catalog requests it served."""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, products: int = 30, latency: float = 0.0):
+        body = json.dumps({"products": generate_products(products), "total": products, "skip": 0, "limit": products}).encode()
+        self.requests = 0
+        self.latency = latency
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] != "/products":
+                    self.send_response(404)
+                    self.end_headers()
+                    return
+                server.requests += 1
+                if server.latency:
+                    time.sleep(server.latency)
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer((host, port), Handler)
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}/products"
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--products", type=int, default=30)
+    parser.add_argument("--latency", type=float, default=0.0, help="Artificial delay per request, in seconds.")
+    args = parser.parse_args()
+    server = FakeCatalogServer(args.host, args.port, args.products, args.latency)
+    print(f"Serving {args.products} products at {server.url}")
+    server.httpd.serve_forever()
@@ -0,0 +1,93 @@
+"""Measure the startup cost of importing each module: wall time and resident
+memory added, each in a fresh interpreter so earlier imports don't hide the
+cost of later ones. Save a run with --output and pass it back with
+--baseline to fail (exit code 1) when a module got slower or bigger than the
+allowed tolerance.
+
+    python -m benchmarks.import_time --output import_baseline.json
+    python -m benchmarks.import_time --baseline import_baseline.json
+"""
+import argparse
+import json
+import subprocess
+import sys
+
+DEFAULT_MODULES = [
+    "main",
+    "reporting_app",
+    "routes.auth",
+    "routes.user",
+    "routes.order",
+    "routes.status",
+    "routes.product",
+    "routes.reporting",
+    "routes.admin",
+    "utils.pdf_renderer",
+    "pandas",
+    "xhtml2pdf.pisa",
+]
+
+# Runs in the child interpreter: RSS from /proc, so this works on Linux only
+PROBE = """
+import importlib, json, sys, time
+
+def rss_kb():
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1])
+
+before = rss_kb()
+start = time.perf_counter()
+importlib.import_module(sys.argv[1])
+elapsed = time.perf_counter() - start
+heavy = [m for m in ("pandas", "xhtml2pdf", "reportlab") if m in sys.modules]
+print(json.dumps({"import_ms": elapsed * 1000, "rss_kb": rss_kb() - before, "heavy_modules": heavy}))
+"""
+
+def measure(module: str, repeat: int) -> dict:
+    runs = []
+    for _ in range(repeat):
+        result = subprocess.run([sys.executable, "-c", PROBE, module], capture_output=True, text=True)
+        if result.returncode != 0:
+            return {"error": result.stderr.strip().splitlines()[-1]}
+        runs.append(json.loads(result.stdout.strip().splitlines()[-1]))
+    # Best of n: the noise is all on the slow side
+    best = min(runs, key=lambda run: run["import_ms"])
+    return {
+        "import_ms": round(best["import_ms"], 1),
+        "rss_mb": round(min(run["rss_kb"] for run in runs) / 1024, 1),
+        "heavy_modules": best["heavy_modules"],
+    }
+
+def regressions(results: dict, baseline: dict, tolerance: float) -> list[str]:
+    found = []
+    for module, current in results.items():
+        previous = baseline.get(module)
+        if not previous or "error" in current or "error" in previous:
+            continue
+        for metric in ("import_ms", "rss_mb"):
+            if current[metric] > previous[metric] * (1 + tolerance):
+                found.append(f"{module}: {metric} {previous[metric]} -> {current[metric]}")
+    return found
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("modules", nargs="*", default=DEFAULT_MODULES)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", help="Write the results to this JSON file")
+    parser.add_argument("--baseline", help="JSON file from an earlier --output run to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed relative growth before failing")
+    args = parser.parse_args()
+
+    results = {module: measure(module, args.repeat) for module in args.modules}
+    print(json.dumps(results, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.baseline:
+        with open(args.baseline) as f:
+            found = regressions(results, json.load(f), args.tolerance)
+        for line in found:
+            print(f"REGRESSION {line}", file=sys.stderr)
+        sys.exit(1 if found else 0)
@@ -0,0 +1,288 @@
+"""Load test the API end to end, against local stand-ins for every dependency.
+
+Starts the real app (main:app under uvicorn) against the local Postgres and
+Redis from the environment, with the catalog served by FakeCatalogServer,
+and drives it with the users and orders created by seeder.py. Each scenario
+runs for --duration seconds with --concurrency clients and reports
+throughput and p50/p95/p99 latency as JSON, to be compared across commits
+with benchmarks.compare:
+
+    python seeder.py --bypass-warning
+    python -m benchmarks.load --duration 10 --output before.json
+    python -m benchmarks.load --duration 10 --output after.json
+    python -m benchmarks.compare before.json after.json
+
+--reseed drops and re-creates the tables first, --url targets an app that is
+already running instead of starting one.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import time
+from datetime import datetime
+import httpx
+from benchmarks.fake_catalog import FakeCatalogServer, CATEGORIES, TAGS
+
+SCENARIOS = ["login", "product_search", "add_to_order", "order_listing", "report_excel", "report_csv", "report_pdf", "mixed"]
+# Share of each request type in the mixed scenario
+MIXED_WEIGHTS = {
+    "login": 1,
+    "product_search": 10,
+    "add_to_order": 4,
+    "order_listing": 4,
+    "report_excel": 1,
+    "report_csv": 1,
+    "report_pdf": 1,
+}
+
+class Context:
+    """Tokens and order ids of the seeded users, shared by every scenario."""
+
+    def __init__(self, users: int, products: int, rng: random.Random):
+        self.users = users
+        self.products = products
+        self.rng = rng
+        self.clients: list[dict] = []  # {"username", "password", "headers", "order_id"}
+        self.admin_headers: dict = {}
+
+    def client(self) -> dict:
+        return self.rng.choice(self.clients)
+
+async def login(client: httpx.AsyncClient, username: str, password: str) -> dict:
+    response = await client.post("/api/auth/login", data={"username": username, "password": password})
+    response.raise_for_status()
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+async def prepare(client: httpx.AsyncClient, ctx: Context):
+    """Log the seeded users in and make sure each has an open order with products to report on."""
+    ctx.admin_headers = await login(client, f"User {ctx.users}", f"admin{ctx.users}")
+    for i in range(ctx.users):
+        username = f"User {i}"
+        headers = await login(client, username, f"password{i}")
+        response = await client.get(f"/api/orders/user/{username}", headers=headers)
+        # 404 means the user has no orders yet, e.g. a fresh bulk user
+        if response.status_code == 404:
+            orders = []
+        else:
+            response.raise_for_status()
+            orders = response.json()
+        open_orders = [order for order in orders if order["status_id"] == 1]
+        if open_orders:
+            order_id = open_orders[0]["id"]
+        else:
+            body = {"created_at": datetime.now().isoformat(), "user_name": username}
+            response = await client.post("/api/orders/", json=body, headers=headers)
+            response.raise_for_status()
+            order_id = response.json()["id"]
+        items = [{"product_id": ctx.rng.randint(1, ctx.products), "quantity": ctx.rng.randint(1, 3)} for _ in range(5)]
+        response = await client.post("/api/products/order/bulk", params={"order_id": order_id}, json=items, headers=headers)
+        response.raise_for_status()
+        ctx.clients.append({"username": username, "password": f"password{i}", "headers": headers, "order_id": order_id})
+
+# One request each; the scenario name is also the label in the results
+
+async def do_login(client, ctx):
+    user = ctx.client()
+    return await client.post("/api/auth/login", data={"username": user["username"], "password": user["password"]})
+
+async def do_product_search(client, ctx):
+    params = ctx.rng.choice([
+        {"category": ctx.rng.choice(CATEGORIES)},
+        {"tag": ctx.rng.choice(TAGS), "sort_by": "price", "sort_order": "desc"},
+        {"min_price": 100, "max_price": 500, "sort_by": "rating", "limit": 20},
+        {"title": ctx.rng.choice(["item", "laptops", "beauty", "essence"])},
+    ])
+    return await client.get("/api/products/", params=params, headers=ctx.client()["headers"])
+
+async def do_add_to_order(client, ctx):
+    user = ctx.client()
+    params = {"order_id": user["order_id"], "product_id": ctx.rng.randint(1, ctx.products), "product_quantity": 1}
+    return await client.post("/api/products/order", params=params, headers=user["headers"])
+
+async def do_order_listing(client, ctx):
+    return await client.get("/api/orders/", params={"limit": 50}, headers=ctx.admin_headers)
+
+def report(fmt):
+    async def do_report(client, ctx):
+        user = ctx.client()
+        return await client.get(f"/api/reporting/reporting/{fmt}/{user['order_id']}", headers=user["headers"])
+    return do_report
+
+REQUESTS = {
+    "login": do_login,
+    "product_search": do_product_search,
+    "add_to_order": do_add_to_order,
+    "order_listing": do_order_listing,
+    "report_excel": report("excel"),
+    "report_csv": report("csv"),
+    "report_pdf": report("pdf"),
+}
+
+def percentile(sorted_values: list[float], fraction: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(fraction * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+def summarize(latencies: list[float], errors: int, elapsed: float) -> dict:
+    latencies = sorted(latencies)
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "throughput_rps": round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 2),
+        "max_ms": round(latencies[-1] * 1000, 2) if latencies else 0.0,
+    }
+
+async def run_scenario(client: httpx.AsyncClient, ctx: Context, scenario: str, duration: float, concurrency: int, warmup: float) -> dict:
+    if scenario == "mixed":
+        names, weights = list(MIXED_WEIGHTS), list(MIXED_WEIGHTS.values())
+    else:
+        names, weights = [scenario], [1]
+    latencies = {name: [] for name in names}
+    errors = {name: 0 for name in names}
+    recording = False
+
+    async def worker(deadline: float):
+        while time.perf_counter() < deadline:
+            name = ctx.rng.choices(names, weights)[0]
+            start = time.perf_counter()
+            try:
+                response = await REQUESTS[name](client, ctx)
+                failed = response.status_code >= 400
+            except httpx.HTTPError:
+                failed = True
+            if recording:
+                latencies[name].append(time.perf_counter() - start)
+                errors[name] += failed
+
+    if warmup:
+        await asyncio.gather(*(worker(time.perf_counter() + warmup) for _ in range(concurrency)))
+    recording = True
+    start = time.perf_counter()
+    await asyncio.gather(*(worker(start + duration) for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    if scenario != "mixed":
+        return summarize(latencies[scenario], errors[scenario], elapsed)
+    everything = [latency for values in latencies.values() for latency in values]
+    return {
+        **summarize(everything, sum(errors.values()), elapsed),
+        "by_request": {name: summarize(latencies[name], errors[name], elapsed) for name in names},
+    }
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def start_app(port: int, catalog_url: str, workers: int, log_file) -> subprocess.Popen:
+    env = {**os.environ, "PRODUCTS_API_URL": catalog_url}
+    command = [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port),
+               "--workers", str(workers), "--log-level", "warning"]
+    return subprocess.Popen(command, env=env, stdout=log_file, stderr=log_file)
+
+async def wait_until_ready(client: httpx.AsyncClient, process: subprocess.Popen | None, timeout: float = 60):
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        if process is not None and process.poll() is not None:
+            raise RuntimeError(f"The app exited with code {process.returncode}, see --app-log")
+        try:
+            if (await client.get("/openapi.json")).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        await asyncio.sleep(0.2)
+    raise RuntimeError("The app did not start in time")
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+async def run(args) -> dict:
+    ctx = Context(args.users, args.products, random.Random(args.seed))
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=args.url, limits=limits, timeout=args.timeout) as client:
+        await prepare(client, ctx)
+        results = {}
+        for scenario in args.scenarios:
+            results[scenario] = await run_scenario(client, ctx, scenario, args.duration, args.concurrency, args.warmup)
+            print(f"{scenario}: {results[scenario]['throughput_rps']} req/s, p99 {results[scenario]['p99_ms']}ms", file=sys.stderr)
+    return results
+
+async def main(args) -> dict:
+    catalog = process = log_file = None
+    if args.url is None:
+        catalog = FakeCatalogServer(products=args.products, latency=args.catalog_latency).start()
+        port = free_port()
+        args.url = f"http://127.0.0.1:{port}"
+        log_file = open(args.app_log, "w") if args.app_log else subprocess.DEVNULL
+        process = start_app(port, catalog.url, args.workers, log_file)
+    try:
+        async with httpx.AsyncClient(base_url=args.url) as client:
+            await wait_until_ready(client, process)
+        scenarios = await run(args)
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait(timeout=30)
+        if catalog is not None:
+            catalog.stop()
+        if log_file not in (None, subprocess.DEVNULL):
+            log_file.close()
+    return {
+        "meta": {
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "duration_seconds": args.duration,
+            "concurrency": args.concurrency,
+            "workers": args.workers,
+            "users": args.users,
+            "products": args.products,
+            "seed": args.seed,
+        },
+        "scenarios": scenarios,
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--scenarios", type=lambda value: value.split(","), default=SCENARIOS,
+                        help=f"Comma separated, from: {','.join(SCENARIOS)}")
+    parser.add_argument("--duration", type=float, default=10, help="Seconds measured per scenario.")
+    parser.add_argument("--warmup", type=float, default=2, help="Seconds run before measuring each scenario.")
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--timeout", type=float, default=30, help="Per request, in seconds.")
+    parser.add_argument("--users", type=int, default=5, help="Client users created by the seeder (the admin is the next one).")
+    parser.add_argument("--products", type=int, default=100, help="Products in the fake catalog.")
+    parser.add_argument("--catalog-latency", type=float, default=0.0, help="Delay of the fake catalog, in seconds.")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes.")
+    parser.add_argument("--seed", type=int, default=42, help="Seed for the request mix, so runs are repeatable.")
+    parser.add_argument("--reseed", action="store_true", help="Drop, re-create and seed the tables first.")
+    parser.add_argument("--url", help="Benchmark an app that is already running instead of starting one.")
+    parser.add_argument("--app-log", help="Write the app's output to this file.")
+    parser.add_argument("--output", help="Write the results to this JSON file")
+    args = parser.parse_args()
+
+    unknown = set(args.scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"Unknown scenarios: {', '.join(sorted(unknown))}")
+    if args.reseed:
+        from seeder import reset_schema, seed_data
+        reset_schema()
+        seed_data(args.users)
+
+    results = asyncio.run(main(args))
+    print(json.dumps(results, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
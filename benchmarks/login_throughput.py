@@ -0,0 +1,66 @@
+"""Compare login password checks done inline on the event loop, in the
+default threadpool and in the bcrypt process pool. Reports verifications per
+second and the worst event-loop stall seen while they run, which is what
+every other request on the worker experiences.
+
+    python -m benchmarks.login_throughput --logins 200 --concurrency 50
+"""
+import argparse
+import asyncio
+import json
+import time
+from starlette.concurrency import run_in_threadpool
+from auth.hashing import hash_password, hashing_pool, verify_password, verify_password_async
+
+async def loop_lag_probe(stop: asyncio.Event, interval: float = 0.005) -> float:
+    worst = 0.0
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        worst = max(worst, time.perf_counter() - start - interval)
+    return worst
+
+async def inline(password, hashed):
+    return verify_password(password, hashed)
+
+async def threadpool(password, hashed):
+    return await run_in_threadpool(verify_password, password, hashed)
+
+async def pooled(password, hashed):
+    return await verify_password_async(password, hashed)
+
+async def measure(mode, logins: int, concurrency: int, hashed: str) -> dict:
+    stop = asyncio.Event()
+    probe = asyncio.create_task(loop_lag_probe(stop))
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def login():
+        async with semaphore:
+            assert await mode("secret", hashed)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(login() for _ in range(logins)))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    return {
+        "logins_per_second": round(logins / elapsed, 1),
+        "max_loop_stall_ms": round(await probe * 1000, 1),
+    }
+
+async def run(logins: int, concurrency: int) -> dict:
+    hashed = hash_password("secret")
+    hashing_pool.start()
+    # Spawn the workers before timing anything
+    await asyncio.gather(*(verify_password_async("secret", hashed) for _ in range(hashing_pool.max_workers)))
+    results = {"logins": logins, "concurrency": concurrency, "workers": hashing_pool.max_workers}
+    for name, mode in (("inline", inline), ("threadpool", threadpool), ("process_pool", pooled)):
+        results[name] = await measure(mode, logins, concurrency, hashed)
+    hashing_pool.shutdown()
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=50)
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(run(args.logins, args.concurrency)), indent=2))
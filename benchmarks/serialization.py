@@ -0,0 +1,105 @@
+"""Cost of encoding a large order listing, per 10k rows.
+
+Compares the ways GET /api/orders can answer with the same JSON:
+
+- response_model: ORM objects validated through response_model and encoded
+  with the stdlib json encoder (FastAPI's default path)
+- response_model_orjson: the same validation, encoded with orjson
+  (ORJSONResponse as the default response class)
+- rows_orjson: plain rows from the query encoded with orjson directly, what
+  the listings now return
+
+    python -m benchmarks.serialization --rows 10000 --repeat 5
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+from datetime import datetime, timedelta
+from fastapi.responses import JSONResponse, ORJSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_model_field
+from benchmarks.fake_catalog import generate_products
+from crud.order import order_totals
+from models.order import Order, OrderReadDetailed
+from models.status import Status
+from models.user import User
+
+def build_rows(count: int, seed: int = 42) -> list[dict]:
+    """Rows shaped like OrderReadDetailed, with carts of 0 to 10 products."""
+    rng = random.Random(seed)
+    catalog = generate_products(100)
+    start = datetime(2025, 1, 1)
+    rows = []
+    for i in range(1, count + 1):
+        products = [
+            {"id": p["id"], "title": p["title"], "quantity": rng.randint(1, 5), "price": p["price"]}
+            for p in rng.sample(catalog, rng.randint(0, 10))
+        ]
+        item_count, total = order_totals(products)
+        rows.append({
+            "created_at": start + timedelta(seconds=i * 37),
+            "products": products,
+            "id": i,
+            "status_id": 1,
+            "user_id": i % 500 + 1,
+            "item_count": item_count,
+            "total": total,
+            "status_name": "Order Created",
+            "user_name": f"User {i % 500}",
+        })
+    return rows
+
+def build_orders(rows: list[dict]) -> list[Order]:
+    """The same rows as loaded ORM objects, with their status and user attached."""
+    status = Status(id=1, name="Order Created", color="Yellow")
+    users = {}
+    orders = []
+    for row in rows:
+        user = users.get(row["user_id"])
+        if user is None:
+            user = users[row["user_id"]] = User(id=row["user_id"], username=row["user_name"], email=f"user{row['user_id']}@example.com", hashed_password="x", created_at=row["created_at"])
+        fields = {key: value for key, value in row.items() if key not in ("status_name", "user_name")}
+        orders.append(Order(**fields, status=status, user=user))
+    return orders
+
+def best_of(repeat: int, fn) -> tuple[float, int]:
+    best, size = float("inf"), 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        size = len(fn())
+        best = min(best, time.perf_counter() - start)
+    return best, size
+
+def run(rows_count: int, repeat: int) -> dict:
+    rows = build_rows(rows_count)
+    orders = build_orders(rows)
+    field = create_model_field(name="Response_read_all", type_=list[OrderReadDetailed], mode="serialization")
+
+    def validated():
+        return asyncio.run(serialize_response(field=field, response_content=orders))
+
+    modes = {
+        "response_model": lambda: JSONResponse(validated()).body,
+        "response_model_orjson": lambda: ORJSONResponse(validated()).body,
+        "rows_orjson": lambda: ORJSONResponse(rows).body,
+    }
+    # Same document either way
+    assert json.loads(modes["response_model"]()) == json.loads(modes["rows_orjson"]())
+
+    results = {"rows": rows_count}
+    for name, fn in modes.items():
+        seconds, size = best_of(repeat, fn)
+        results[name] = {"ms_per_10k_rows": round(seconds * 1000 * 10000 / rows_count, 1), "bytes": size}
+    baseline = results["response_model"]["ms_per_10k_rows"]
+    for name in modes:
+        results[name]["speedup"] = round(baseline / results[name]["ms_per_10k_rows"], 1)
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    print(json.dumps(run(args.rows, args.repeat), indent=2))
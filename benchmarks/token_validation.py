@@ -0,0 +1,67 @@
+"""Measure access token validations per second: decoding the JWT on every
+request (no revocation check), decoding plus a Redis GET per request, and the
+cached, revocation-aware validate_access_token used by get_current_user.
+The Redis modes need the Redis configured through REDIS_HOST/REDIS_PORT.
+
+    python -m benchmarks.token_validation --tokens 100 --validations 50000
+"""
+import argparse
+import asyncio
+import json
+import time
+from redis.exceptions import RedisError
+from auth.jwt import _encode_access_token, decode_access_token, validate_access_token
+from auth.redis_client import close_redis, get_redis
+from auth.revocation import REVOKED_PREFIX, revocation_list
+
+async def decode_only(token):
+    return decode_access_token(token)
+
+async def decode_and_get(token):
+    payload = decode_access_token(token)
+    if await get_redis().exists(f"{REVOKED_PREFIX}{payload['jti']}"):
+        return None
+    return payload
+
+async def cached(token):
+    return await validate_access_token(token)
+
+async def measure(mode, tokens: list[str], validations: int) -> dict:
+    start = time.perf_counter()
+    for i in range(validations):
+        assert await mode(tokens[i % len(tokens)])
+    elapsed = time.perf_counter() - start
+    return {
+        "validations_per_second": round(validations / elapsed, 1),
+        "avg_us": round(elapsed / validations * 1_000_000, 2),
+    }
+
+async def run(token_count: int, validations: int) -> dict:
+    tokens = [_encode_access_token({"sub": f"user{i}", "id": i}, role="user")[0] for i in range(token_count)]
+    results = {"tokens": token_count, "validations": validations}
+    results["decode_only"] = await measure(decode_only, tokens, validations)
+
+    try:
+        await get_redis().ping()
+    except RedisError as e:
+        results["redis"] = f"unavailable: {e}"
+        return results
+
+    results["decode_and_redis_get"] = await measure(decode_and_get, tokens, validations)
+    await revocation_list.start()
+    for _ in range(50):
+        if revocation_list.subscribed:
+            break
+        await asyncio.sleep(0.1)
+    results["cached"] = await measure(cached, tokens, validations)
+    results["cached"]["subscribed"] = revocation_list.subscribed
+    await revocation_list.stop()
+    await close_redis()
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tokens", type=int, default=100)
+    parser.add_argument("--validations", type=int, default=50000)
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(run(args.tokens, args.validations)), indent=2))
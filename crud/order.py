@@ -1,9 +1,53 @@
+import json
+from datetime import datetime
+from decimal import ROUND_HALF_UP, Decimal
+from typing import Optional
+from sqlalchemy import select as sa_select, text
+from sqlalchemy.orm import contains_eager, joinedload
 from sqlmodel import Session, select
+from sqlmodel.ext.asyncio.session import AsyncSession
 from models.order import Order
+from models.status import Status
 from models.user import User
-from crud.user import get_user_by_name
+from utils.pagination import keyset_page, stored_datetime
+from utils.report_cache import report_cache
+
+def order_totals(products: Optional[list[dict]]) -> tuple[int, float]:
+    """Units and value of a products list, as stored in Order.item_count and Order.total."""
+    lines = products or []
+    # A missing or null quantity or price counts as 0, as in order_totals_sql()
+    item_count = sum(int(line.get("quantity") or 0) for line in lines)
+    # Decimal arithmetic rounds like numeric in order_totals_sql()
+    total = sum((Decimal(str(line.get("price") or 0)) * int(line.get("quantity") or 0) for line in lines), Decimal(0))
+    return item_count, float(total.quantize(Decimal("0.01"), ROUND_HALF_UP))
+
+def _apply_order_data(order: Order, order_data: dict):
+    for key, value in order_data.items():
+        # Derived from products, never set directly
+        if key not in ("item_count", "total"):
+            setattr(order, key, value)
+    if "products" in order_data:
+        order.item_count, order.total = order_totals(order.products)
+
+def with_order_details(statement):
+    """Load each order's status and user name in the same query (LEFT JOINs), for OrderReadDetailed."""
+    return statement.options(
+        joinedload(Order.status),
+        joinedload(Order.user).load_only(User.id, User.username),
+    )
+
+def with_order_detail_columns(statement):
+    """The orders matched by `statement` as plain OrderReadDetailed columns, for listings that skip ORM objects."""
+    # A plain SQLAlchemy select, session.exec() would return only the first column of sqlmodel's
+    rows = sa_select(
+        *Order.__table__.columns, Status.name.label("status_name"), User.username.label("user_name")
+    ).select_from(
+        Order.__table__.outerjoin(Status.__table__, Order.status_id == Status.id).outerjoin(User.__table__, Order.user_id == User.id)
+    )
+    return rows if statement.whereclause is None else rows.where(statement.whereclause)
 
 def create_order(session: Session, order: Order):
+    order.item_count, order.total = order_totals(order.products)
     session.add(order)
     session.commit()
     session.refresh(order)
@@ -19,8 +63,7 @@ def update_order_by_id(session: Session, order_id: int, order_data: dict):
     order = session.get(Order, order_id)
     if not order:
         return None
-    for key, value in order_data.items():
-        setattr(order, key, value)
+    _apply_order_data(order, order_data)
     session.commit()
     session.refresh(order)
     return order
@@ -32,9 +75,207 @@ def delete_order_by_id(session: Session, order_id: int):
         session.commit()
     return order
 
+def orders_by_user_name_statement(user_name: str):
+    # One query: filter through the join instead of looking the user up first, and fill
+    # Order.user from that same join rather than joining "user" a second time
+    return select(Order).join(Order.user).where(User.username == user_name).options(
+        joinedload(Order.status),
+        contains_eager(Order.user).load_only(User.id, User.username),
+    )
+
 def get_orders_by_user_name(session: Session, user_name: str):
-    user = get_user_by_name(session, user_name)
-    if not user:
-        return []
-    statement = select(Order).where(Order.user_id == user.id)
-    return session.exec(statement).all()
\ No newline at end of file
+    return session.exec(orders_by_user_name_statement(user_name)).all()
+
+# Async variants, used by the API routes
+
+async def create_order_async(session: AsyncSession, order: Order):
+    order.item_count, order.total = order_totals(order.products)
+    session.add(order)
+    await session.commit()
+    await session.refresh(order)
+    return order
+
+async def get_orders_async(session: AsyncSession):
+    return (await session.exec(select(Order))).all()
+
+def orders_statement(
+    status_id: Optional[int] = None,
+    user_id: Optional[int] = None,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    min_total: Optional[float] = None,
+    max_total: Optional[float] = None,
+):
+    statement = select(Order)
+    if status_id is not None:
+        statement = statement.where(Order.status_id == status_id)
+    if user_id is not None:
+        statement = statement.where(Order.user_id == user_id)
+    if created_from:
+        statement = statement.where(Order.created_at >= stored_datetime(created_from))
+    if created_to:
+        statement = statement.where(Order.created_at < stored_datetime(created_to))
+    if min_total is not None:
+        statement = statement.where(Order.total >= min_total)
+    if max_total is not None:
+        statement = statement.where(Order.total <= max_total)
+    return statement
+
+async def get_orders_page_async(
+    session: AsyncSession,
+    limit: int,
+    cursor: Optional[str] = None,
+    order_by: str = "id",
+    descending: bool = False,
+    status_id: Optional[int] = None,
+    user_id: Optional[int] = None,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    min_total: Optional[float] = None,
+    max_total: Optional[float] = None,
+):
+    statement = with_order_details(orders_statement(status_id, user_id, created_from, created_to, min_total, max_total))
+    return await keyset_page(session, statement, Order, limit, cursor, order_by, descending)
+
+async def get_order_rows_page_async(
+    session: AsyncSession,
+    limit: int,
+    cursor: Optional[str] = None,
+    order_by: str = "id",
+    descending: bool = False,
+    status_id: Optional[int] = None,
+    user_id: Optional[int] = None,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    min_total: Optional[float] = None,
+    max_total: Optional[float] = None,
+) -> tuple[list[dict], Optional[str]]:
+    """get_orders_page_async() as dicts shaped like OrderReadDetailed, ready to be encoded as they are."""
+    statement = with_order_detail_columns(orders_statement(status_id, user_id, created_from, created_to, min_total, max_total))
+    rows, next_cursor = await keyset_page(session, statement, Order, limit, cursor, order_by, descending)
+    return [row._asdict() for row in rows], next_cursor
+
+async def get_order_by_id_async(session: AsyncSession, order_id: int):
+    return await session.get(Order, order_id)
+
+async def get_order_detailed_async(session: AsyncSession, order_id: int):
+    """Order with its status and user name, in one query."""
+    return (await session.exec(with_order_details(select(Order).where(Order.id == order_id)))).first()
+
+async def get_order_version_async(session: AsyncSession, order_id: int) -> Optional[tuple[str, int]]:
+    """(version, user_id) of an order, without loading it.
+
+    The version is built from the xmin of the order and of the user and
+    status shown with it, so it changes whenever any of the three is updated.
+    """
+    sql = """
+        SELECT concat_ws('.', o.xmin::text, u.xmin::text, s.xmin::text), o.user_id
+        FROM "order" o
+        LEFT JOIN "user" u ON u.id = o.user_id
+        LEFT JOIN status s ON s.id = o.status_id
+        WHERE o.id = :order_id
+    """
+    row = (await session.execute(text(sql), {"order_id": order_id})).first()
+    return tuple(row) if row else None
+
+async def update_order_by_id_async(session: AsyncSession, order_id: int, order_data: dict):
+    order = await session.get(Order, order_id)
+    if not order:
+        return None
+    _apply_order_data(order, order_data)
+    await session.commit()
+    await session.refresh(order)
+    await report_cache.invalidate(order_id)
+    return order
+
+async def delete_order_by_id_async(session: AsyncSession, order_id: int):
+    order = await session.get(Order, order_id)
+    if order:
+        await session.delete(order)
+        await session.commit()
+        await report_cache.invalidate(order_id)
+    return order
+
+async def get_orders_by_user_name_async(session: AsyncSession, user_name: str):
+    return (await session.exec(orders_by_user_name_statement(user_name))).all()
+
+# Line items. Each change is one UPDATE computed from the row's current products, so
+# concurrent changes to the same order serialize on the row lock instead of
+# overwriting each other. The same statement keeps item_count and total in step with
+# the new products. Only open orders (status_id = 1) are changed; the functions
+# return None when no row qualified.
+
+_OPEN_ORDER = 'o.id = :order_id AND o.status_id = 1'
+# Orders without products hold SQL NULL or a JSON null, depending on how they were created
+_LINES = "(CASE WHEN jsonb_typeof(o.products) = 'array' THEN o.products ELSE '[]'::jsonb END)"
+_HAS_PRODUCT = "o.products @> jsonb_build_array(jsonb_build_object('id', CAST(:product_id AS integer)))"
+
+def order_totals_sql(lines: str) -> str:
+    """SELECT of (item_count, total) over the JSONB products array `lines`, matching order_totals()."""
+    return f"""
+        SELECT coalesce(sum(coalesce((l->>'quantity')::int, 0)), 0) AS item_count,
+               round(coalesce(sum(coalesce((l->>'price')::numeric, 0) * coalesce((l->>'quantity')::int, 0)), 0), 2)::double precision AS total
+        FROM jsonb_array_elements({lines}) AS l"""
+
+def _set_lines(new_products: str, where: str) -> str:
+    return f"""
+UPDATE "order" o SET (products, item_count, total) = (
+    SELECT n.products, t.item_count, t.total
+    FROM ({new_products}) AS n(products),
+    LATERAL ({order_totals_sql("n.products")}) AS t
+)
+WHERE {where}
+RETURNING o.*
+"""
+
+# Incoming items are merged into existing lines (quantities added, title and price
+# refreshed), the rest are appended in request order
+_ADD_PRODUCTS = """
+WITH incoming AS (
+    SELECT i.item, i.item->'id' AS product_id, i.ord
+    FROM jsonb_array_elements(CAST(:items AS jsonb)) WITH ORDINALITY AS i(item, ord)
+)""" + _set_lines(f"""
+    SELECT jsonb_agg(line ORDER BY grp, pos) FROM (
+        SELECT CASE WHEN n.item IS NULL THEN p.line
+                    ELSE p.line || jsonb_build_object(
+                        'title', n.item->'title',
+                        'price', n.item->'price',
+                        'quantity', (p.line->>'quantity')::int + (n.item->>'quantity')::int)
+               END AS line, 0 AS grp, p.pos
+        FROM jsonb_array_elements({_LINES}) WITH ORDINALITY AS p(line, pos)
+        LEFT JOIN incoming n ON n.product_id = p.line->'id'
+        UNION ALL
+        SELECT n.item, 1, n.ord FROM incoming n
+        WHERE NOT {_LINES} @> jsonb_build_array(jsonb_build_object('id', n.product_id))
+    ) lines""", _OPEN_ORDER)
+
+_REMOVE_PRODUCT = _set_lines(f"""
+    SELECT coalesce(jsonb_agg(p.line ORDER BY p.pos), '[]'::jsonb)
+    FROM jsonb_array_elements({_LINES}) WITH ORDINALITY AS p(line, pos)
+    WHERE p.line->'id' <> to_jsonb(CAST(:product_id AS integer))""", f"{_OPEN_ORDER} AND {_HAS_PRODUCT}")
+
+_SET_PRODUCT_QUANTITY = _set_lines(f"""
+    SELECT jsonb_agg(
+        CASE WHEN p.line->'id' = to_jsonb(CAST(:product_id AS integer))
+             THEN jsonb_set(p.line, '{{quantity}}', to_jsonb(CAST(:quantity AS integer)))
+             ELSE p.line
+        END ORDER BY p.pos)
+    FROM jsonb_array_elements({_LINES}) WITH ORDINALITY AS p(line, pos)""", f"{_OPEN_ORDER} AND {_HAS_PRODUCT}")
+
+async def _update_order_lines(session: AsyncSession, order_id: int, sql: str, **params) -> Optional[Order]:
+    statement = select(Order).from_statement(text(sql).bindparams(order_id=order_id, **params))
+    order = (await session.execute(statement.execution_options(populate_existing=True))).scalars().first()
+    await session.commit()
+    if order:
+        await report_cache.invalidate(order_id)
+    return order
+
+async def add_products_to_order_async(session: AsyncSession, order_id: int, items: list[dict]) -> Optional[Order]:
+    """Add items ({"id", "title", "price", "quantity"}, one per product id) to an open order."""
+    return await _update_order_lines(session, order_id, _ADD_PRODUCTS, items=json.dumps(items))
+
+async def remove_product_from_order_async(session: AsyncSession, order_id: int, product_id: int) -> Optional[Order]:
+    return await _update_order_lines(session, order_id, _REMOVE_PRODUCT, product_id=product_id)
+
+async def set_product_quantity_async(session: AsyncSession, order_id: int, product_id: int, quantity: int) -> Optional[Order]:
+    return await _update_order_lines(session, order_id, _SET_PRODUCT_QUANTITY, product_id=product_id, quantity=quantity)
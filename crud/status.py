@@ -1,5 +1,7 @@
 from sqlmodel import Session, select
+from sqlmodel.ext.asyncio.session import AsyncSession
 from models.status import Status
+from utils.status_cache import status_cache
 
 def create_status(session: Session, status: Status):
     existing_status = session.exec(select(Status).where(Status.name == status.name)).first()
@@ -8,6 +10,7 @@ def create_status(session: Session, status: Status):
     session.add(status)
     session.commit()
     session.refresh(status)
+    status_cache.invalidate_sync()
     return status
 
 def get_status(session: Session):
@@ -28,6 +31,7 @@ def update_status_by_id(session: Session, status_id: int, status_data: dict):
         setattr(status, key, value)
     session.commit()
     session.refresh(status)
+    status_cache.invalidate_sync()
     return status
 
 def delete_status_by_id(session: Session, id: int):
@@ -36,4 +40,52 @@ def delete_status_by_id(session: Session, id: int):
     if status:
         session.delete(status)
         session.commit()
-    return status
\ No newline at end of file
+        status_cache.invalidate_sync()
+    return status
+
+# Async variants, used by the API routes
+
+async def create_status_async(session: AsyncSession, status: Status):
+    existing_status = (await session.exec(select(Status).where(Status.name == status.name))).first()
+    if existing_status:
+        raise ValueError(f"A status with name '{status.name}' already exists.")
+    session.add(status)
+    await session.commit()
+    await session.refresh(status)
+    await status_cache.invalidate()
+    return status
+
+# Reads are served from the process-local snapshot, see utils/status_cache.py.
+# They return StatusRead values shared between requests, don't modify them
+
+async def get_status_snapshot_async(session: AsyncSession):
+    return await status_cache.get(session)
+
+async def get_status_async(session: AsyncSession):
+    return list((await status_cache.get(session)).statuses)
+
+async def get_status_by_id_async(session: AsyncSession, status_id: int):
+    return (await status_cache.get(session)).by_id.get(status_id)
+
+async def get_status_by_name_async(session: AsyncSession, name: str):
+    return (await status_cache.get(session)).by_name.get(name)
+
+async def update_status_by_id_async(session: AsyncSession, status_id: int, status_data: dict):
+    status = await session.get(Status, status_id)
+    if not status:
+        return None
+    for key, value in status_data.items():
+        setattr(status, key, value)
+    await session.commit()
+    await session.refresh(status)
+    await status_cache.invalidate()
+    return status
+
+async def delete_status_by_id_async(session: AsyncSession, id: int):
+    statement = select(Status).where(Status.id == id)
+    status = (await session.exec(statement)).first()
+    if status:
+        await session.delete(status)
+        await session.commit()
+        await status_cache.invalidate()
+    return status
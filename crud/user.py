@@ -1,6 +1,11 @@
+from datetime import datetime
+from typing import Optional
 from pydantic import EmailStr
+from sqlalchemy import select as sa_select, text
 from sqlmodel import Session, select
+from sqlmodel.ext.asyncio.session import AsyncSession
 from models.user import User
+from utils.pagination import keyset_page, stored_datetime
 
 def create_user(session: Session, user: User):
     existing_user = session.exec(select(User).where(User.email == user.email)).first()
@@ -62,4 +67,110 @@ def delete_user_by_name(session: Session, name: str):
     if user:
         session.delete(user)
         session.commit()
-    return user
\ No newline at end of file
+    return user
+
+# Async variants, used by the API routes
+
+async def create_user_async(session: AsyncSession, user: User):
+    existing_user = (await session.exec(select(User).where(User.email == user.email))).first()
+    if existing_user:
+        raise ValueError(f"A user with email '{user.email}' already exists.")
+    session.add(user)
+    await session.commit()
+    await session.refresh(user)
+    return user
+
+async def get_all_users_async(session: AsyncSession):
+    return (await session.exec(select(User))).all()
+
+async def get_all_users_wp_async(session: AsyncSession, skip: int = 0, limit: int = 10):
+    return (await session.exec(select(User).offset(skip).limit(limit))).all()
+
+def users_statement(created_from: Optional[datetime] = None, created_to: Optional[datetime] = None):
+    statement = select(User)
+    if created_from:
+        statement = statement.where(User.created_at >= stored_datetime(created_from))
+    if created_to:
+        statement = statement.where(User.created_at < stored_datetime(created_to))
+    return statement
+
+async def get_users_page_async(
+    session: AsyncSession,
+    limit: int,
+    cursor: Optional[str] = None,
+    order_by: str = "id",
+    descending: bool = False,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+):
+    statement = users_statement(created_from, created_to)
+    return await keyset_page(session, statement, User, limit, cursor, order_by, descending)
+
+async def get_user_rows_page_async(
+    session: AsyncSession,
+    limit: int,
+    cursor: Optional[str] = None,
+    order_by: str = "id",
+    descending: bool = False,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+) -> tuple[list[dict], Optional[str]]:
+    """get_users_page_async() as dicts of the user columns, ready to be encoded as they are."""
+    # A plain SQLAlchemy select, session.exec() would return only the first column of sqlmodel's
+    filters = users_statement(created_from, created_to).whereclause
+    statement = sa_select(*User.__table__.columns)
+    if filters is not None:
+        statement = statement.where(filters)
+    rows, next_cursor = await keyset_page(session, statement, User, limit, cursor, order_by, descending)
+    return [row._asdict() for row in rows], next_cursor
+
+async def get_user_by_id_async(session: AsyncSession, user_id: int):
+    return await session.get(User, user_id)
+
+async def get_user_version_async(session: AsyncSession, user_id: int) -> Optional[str]:
+    """The row's xmin, which changes with every update of the user, or None if it doesn't exist."""
+    return (await session.execute(text('SELECT xmin::text FROM "user" WHERE id = :user_id'), {"user_id": user_id})).scalar()
+
+async def get_user_by_name_async(session: AsyncSession, name: str):
+    statement = select(User).where(User.username == name)
+    return (await session.exec(statement)).first()
+
+async def get_user_by_mail_async(session: AsyncSession, mail: EmailStr):
+    statement = select(User).where(User.email == mail)
+    return (await session.exec(statement)).first()
+
+async def update_user_by_id_async(session: AsyncSession, user_id: int, user_data: dict):
+    user = await session.get(User, user_id)
+    if not user:
+        return None
+    for key, value in user_data.items():
+        setattr(user, key, value)
+    await session.commit()
+    await session.refresh(user)
+    return user
+
+async def update_user_by_name_async(session: AsyncSession, name: str, user_data: dict):
+    statement = select(User).where(User.username == name)
+    user = (await session.exec(statement)).first()
+    if not user:
+        return None
+    for key, value in user_data.items():
+        setattr(user, key, value)
+    await session.commit()
+    await session.refresh(user)
+    return user
+
+async def delete_user_by_id_async(session: AsyncSession, user_id: int):
+    user = await session.get(User, user_id)
+    if user:
+        await session.delete(user)
+        await session.commit()
+    return user
+
+async def delete_user_by_name_async(session: AsyncSession, name: str):
+    statement = select(User).where(User.username == name)
+    user = (await session.exec(statement)).first()
+    if user:
+        await session.delete(user)
+        await session.commit()
+    return user
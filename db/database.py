@@ -1,5 +1,9 @@
 import os
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlmodel import SQLModel, create_engine, Session
+from sqlmodel.ext.asyncio.session import AsyncSession
+from db.pool import InstrumentedAsyncQueuePool, InstrumentedQueuePool, instrument_engine, pool_status
+from utils.metrics import registry
 
 # Construct DATABASE_URL from individual environment variables
 DB_USER = os.getenv("DB_USER", "postgres")
@@ -9,8 +13,45 @@ DB_PORT = os.getenv("DB_PORT", "5432")
 DB_NAME = os.getenv("POSTGRES_DB", "postgres")
 
 DATABASE_URL = f"postgresql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
+ASYNC_DATABASE_URL = f"postgresql+asyncpg://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
 
-engine = create_engine(DATABASE_URL, echo=False)
+# Connection pool settings, per worker process. Size them so workers * (size + overflow) fits max_connections
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "-1"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "false").lower() in ("1", "true", "yes")
+# Server-side limit for every statement, in milliseconds. 0 disables it
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "0"))
+
+pool_options = {
+    "pool_size": DB_POOL_SIZE,
+    "max_overflow": DB_MAX_OVERFLOW,
+    "pool_timeout": DB_POOL_TIMEOUT,
+    "pool_recycle": DB_POOL_RECYCLE,
+    "pool_pre_ping": DB_POOL_PRE_PING,
+}
+
+sync_connect_args = {}
+async_connect_args = {}
+if DB_STATEMENT_TIMEOUT_MS:
+    sync_connect_args["options"] = f"-c statement_timeout={DB_STATEMENT_TIMEOUT_MS}"
+    async_connect_args["server_settings"] = {"statement_timeout": str(DB_STATEMENT_TIMEOUT_MS)}
+
+# Sync engine for the seeder and scripts, the API itself only uses async_engine
+engine = create_engine(
+    DATABASE_URL, echo=False, poolclass=InstrumentedQueuePool, pool_logging_name="sync",
+    connect_args=sync_connect_args, **pool_options
+)
+async_engine = create_async_engine(
+    ASYNC_DATABASE_URL, echo=False, poolclass=InstrumentedAsyncQueuePool, pool_logging_name="async",
+    connect_args=async_connect_args, **pool_options
+)
+instrument_engine(engine, "sync")
+instrument_engine(async_engine.sync_engine, "async")
+
+# expire_on_commit=False: expired attributes would trigger lazy loads, which async sessions cannot do implicitly
+async_session_maker = async_sessionmaker(async_engine, class_=AsyncSession, expire_on_commit=False)
 
 def create_db_and_tables():
     SQLModel.metadata.create_all(engine)
@@ -18,6 +59,25 @@ def create_db_and_tables():
 def drop_db_and_tables():
     SQLModel.metadata.drop_all(engine)
 
-def get_session():
+async def get_session():
+    async with async_session_maker() as session:
+        yield session
+
+def get_sync_session():
     with Session(engine) as session:
-        yield session
\ No newline at end of file
+        yield session
+
+def get_pool_status() -> dict:
+    return {
+        "sync": pool_status(engine, "sync"),
+        "async": pool_status(async_engine.sync_engine, "async"),
+    }
+
+def _pool_connections() -> dict:
+    values = {}
+    for name, engine_ in (("sync", engine), ("async", async_engine.sync_engine)):
+        values[(name, "checked_out")] = engine_.pool.checkedout()
+        values[(name, "checked_in")] = engine_.pool.checkedin()
+    return values
+
+registry.gauge("db_pool_connections", "Pooled connections in use and idle, per engine.", ("engine", "state"), collect=_pool_connections)
@@ -0,0 +1,145 @@
+import os
+import time
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+from log.logger import logger
+from utils.metrics import db_query_duration, db_query_errors, statement_type
+
+# Checkouts that wait longer than this are logged, they mean the pool is undersized
+DB_POOL_WAIT_WARN_MS = float(os.getenv("DB_POOL_WAIT_WARN_MS", "100"))
+
+class PoolStats:
+    """Counters for one connection pool, fed by pool events and timed checkouts."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.checkouts = 0
+        self.checkins = 0
+        self.connects = 0
+        self.invalidations = 0
+        self.timeouts = 0
+        self.slow_checkouts = 0
+        self.waits = 0
+        self.wait_total_ms = 0.0
+        self.wait_max_ms = 0.0
+        self.connect_timings = 0
+        self.connect_total_ms = 0.0
+        self.connect_max_ms = 0.0
+
+    def record_wait(self, wait_ms: float):
+        self.waits += 1
+        self.wait_total_ms += wait_ms
+        self.wait_max_ms = max(self.wait_max_ms, wait_ms)
+        if wait_ms > DB_POOL_WAIT_WARN_MS:
+            self.slow_checkouts += 1
+            logger.warning(f"DB pool '{self.name}': waited {wait_ms:.1f}ms for a connection")
+
+    def record_connect(self, connect_ms: float):
+        self.connect_timings += 1
+        self.connect_total_ms += connect_ms
+        self.connect_max_ms = max(self.connect_max_ms, connect_ms)
+
+    def snapshot(self, pool) -> dict:
+        return {
+            "size": pool.size(),
+            "max_overflow": pool._max_overflow,
+            "checked_in": pool.checkedin(),
+            "checked_out": pool.checkedout(),
+            "overflow": max(0, pool.overflow()),
+            "checkouts": self.checkouts,
+            "checkins": self.checkins,
+            "connects": self.connects,
+            "invalidations": self.invalidations,
+            "timeouts": self.timeouts,
+            "slow_checkouts": self.slow_checkouts,
+            "wait_avg_ms": round(self.wait_total_ms / (self.waits or 1), 3),
+            "wait_max_ms": round(self.wait_max_ms, 3),
+            "connect_avg_ms": round(self.connect_total_ms / (self.connect_timings or 1), 3),
+            "connect_max_ms": round(self.connect_max_ms, 3),
+        }
+
+# Keyed by pool logging name: pools are re-created on dispose(), the name survives that
+_pool_stats: dict[str, PoolStats] = {}
+
+class _TimedCheckoutMixin:
+    """Times checkouts, counting the setup of new connections apart from the wait for the pool."""
+
+    def _create_connection(self):
+        started = time.perf_counter()
+        record = super()._create_connection()
+        ended = time.perf_counter()
+        # Read back by _do_get, which may have been waiting before this connect started
+        record._connect_span = (started, ended)
+        stats = _pool_stats.get(self.logging_name)
+        if stats:
+            stats.record_connect((ended - started) * 1000)
+        return record
+
+    def _do_get(self):
+        stats = _pool_stats.get(self.logging_name)
+        start = time.perf_counter()
+        try:
+            record = super()._do_get()
+        except PoolTimeoutError:
+            if stats:
+                stats.timeouts += 1
+                stats.record_wait((time.perf_counter() - start) * 1000)
+            logger.warning(f"DB pool '{self.logging_name}': timed out waiting for a connection")
+            raise
+        if stats:
+            wait_ms = (time.perf_counter() - start) * 1000
+            # A connection created during this checkout: its setup time is not contention
+            connect_started, connect_ended = getattr(record, "_connect_span", (0.0, 0.0))
+            if connect_started >= start:
+                wait_ms -= (connect_ended - connect_started) * 1000
+            stats.record_wait(wait_ms)
+        return record
+
+class InstrumentedQueuePool(_TimedCheckoutMixin, QueuePool):
+    pass
+
+class InstrumentedAsyncQueuePool(_TimedCheckoutMixin, AsyncAdaptedQueuePool):
+    pass
+
+def instrument_engine(engine: Engine, name: str) -> PoolStats:
+    stats = _pool_stats.setdefault(name, PoolStats(name))
+
+    @event.listens_for(engine, "checkout")
+    def on_checkout(dbapi_connection, connection_record, connection_proxy):
+        stats.checkouts += 1
+
+    @event.listens_for(engine, "checkin")
+    def on_checkin(dbapi_connection, connection_record):
+        stats.checkins += 1
+
+    @event.listens_for(engine, "connect")
+    def on_connect(dbapi_connection, connection_record):
+        stats.connects += 1
+
+    @event.listens_for(engine, "invalidate")
+    def on_invalidate(dbapi_connection, connection_record, exception):
+        stats.invalidations += 1
+
+    # Query timings: the start time rides on the execution context of each statement
+    @event.listens_for(engine, "before_cursor_execute")
+    def on_before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if context is not None:
+            context._query_started = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def on_after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        started = getattr(context, "_query_started", None)
+        if started is not None:
+            db_query_duration.observe(time.perf_counter() - started, name, statement_type(statement))
+
+    @event.listens_for(engine, "handle_error")
+    def on_handle_error(exception_context):
+        if exception_context.statement is not None:
+            db_query_errors.inc(name, statement_type(exception_context.statement))
+
+    return stats
+
+def pool_status(engine: Engine, name: str) -> dict:
+    return _pool_stats[name].snapshot(engine.pool)
@@ -1,5 +1,29 @@
+import atexit
+import json
 import logging
+import os
+import queue
 import sys
+from logging.handlers import QueueHandler, QueueListener
+
+ACCESS_LOG_FILE = os.getenv("ACCESS_LOG_FILE", "./log/access.log")
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line, from the dict passed as extra={"fields": {...}}."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        fields = getattr(record, "fields", None) or {"message": record.getMessage()}
+        return json.dumps({"ts": self.formatTime(record), "level": record.levelname, **fields}, default=str)
+
+def _queued(logger: logging.Logger, *handlers: logging.Handler) -> QueueListener:
+    # Loggers only enqueue records; formatting and file/console I/O run on the listener's
+    # thread, so a slow disk never stalls the event loop
+    log_queue = queue.SimpleQueue()
+    logger.addHandler(QueueHandler(log_queue))
+    listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)
+    return listener
 
 logger = logging.getLogger("app_logger")
 logger.setLevel(logging.INFO)
@@ -11,9 +35,22 @@ formatter = logging.Formatter(
 # Log to file
 file_handler = logging.FileHandler("./log/app.log")
 file_handler.setFormatter(formatter)
-logger.addHandler(file_handler)
 
 # Log to console
 console_handler = logging.StreamHandler(sys.stdout)
 console_handler.setFormatter(formatter)
-logger.addHandler(console_handler)
+
+_queued(logger, file_handler, console_handler)
+
+# Access log: JSON lines, written by log.middleware.AccessLogMiddleware
+access_logger = logging.getLogger("access_logger")
+access_logger.setLevel(logging.INFO)
+access_logger.propagate = False
+
+json_formatter = JsonFormatter()
+access_file_handler = logging.FileHandler(ACCESS_LOG_FILE)
+access_file_handler.setFormatter(json_formatter)
+access_console_handler = logging.StreamHandler(sys.stdout)
+access_console_handler.setFormatter(json_formatter)
+
+_queued(access_logger, access_file_handler, access_console_handler)
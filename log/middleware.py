@@ -1,19 +1,80 @@
+import os
+import random
 import time
-from fastapi import Request
-from .logger import logger
+import uuid
+from utils.metrics import http_request_duration, http_requests_in_flight
+from .logger import access_logger
 
-async def log_middleware(request: Request, call_next):
-    start_time = time.time()
+# Fraction of successful requests logged on the sampled routes (or on every route if none are listed).
+# Errors and slow requests are always logged
+ACCESS_LOG_SAMPLE_RATE = float(os.getenv("ACCESS_LOG_SAMPLE_RATE", "1"))
+ACCESS_LOG_SAMPLED_ROUTES = {route.strip() for route in os.getenv("ACCESS_LOG_SAMPLED_ROUTES", "").split(",") if route.strip()}
+ACCESS_LOG_SLOW_MS = float(os.getenv("ACCESS_LOG_SLOW_MS", "1000"))
+REQUEST_ID_HEADER = "X-Request-ID"
 
-    response = await call_next(request)
+def route_template(scope) -> str:
+    """Path template of the matched route (e.g. /api/orders/{order_id}), set in the scope by the router."""
+    route = scope.get("route")
+    return getattr(route, "path", None) or "unmatched"
 
-    process_time = round((time.time() - start_time) * 1000, 2)
-    log_data = {
-        "method": request.method,
-        "url": request.url.path,
-        "status_code": response.status_code,
-        "duration_ms": process_time
-    }
+class AccessLogMiddleware:
+    """Pure ASGI access log: one JSON line per request, without buffering the response.
 
-    logger.info(f"{log_data['method']} {log_data['url']} - {log_data['status_code']} - {log_data['duration_ms']}ms")
-    return response
+    Reuses the caller's X-Request-ID or generates one, returns it on the
+    response and exposes it to handlers as request.state.request_id. Every
+    request, sampled or not, is also counted in the request metrics.
+    """
+
+    def __init__(self, app, sample_rate: float = ACCESS_LOG_SAMPLE_RATE, sampled_routes: set[str] = ACCESS_LOG_SAMPLED_ROUTES, slow_ms: float = ACCESS_LOG_SLOW_MS):
+        self.app = app
+        self.sample_rate = sample_rate
+        self.sampled_routes = sampled_routes
+        self.slow_ms = slow_ms
+        self._header = REQUEST_ID_HEADER.lower().encode()
+
+    def _should_log(self, route: str, status: int, duration_ms: float) -> bool:
+        if status >= 400 or duration_ms >= self.slow_ms or self.sample_rate >= 1:
+            return True
+        if self.sampled_routes and route not in self.sampled_routes:
+            return True
+        return random.random() < self.sample_rate
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        start = time.perf_counter()
+        request_id = next((value.decode("latin-1") for name, value in scope["headers"] if name == self._header), None) or uuid.uuid4().hex
+        scope.setdefault("state", {})["request_id"] = request_id
+        response = {"status": 500, "ttfb_ms": None, "bytes": 0}
+
+        async def send_with_request_id(message):
+            if message["type"] == "http.response.start":
+                response["status"] = message["status"]
+                response["ttfb_ms"] = round((time.perf_counter() - start) * 1000, 2)
+                message["headers"] = [*message.get("headers", []), (self._header, request_id.encode("latin-1"))]
+            elif message["type"] == "http.response.body":
+                response["bytes"] += len(message.get("body", b""))
+            await send(message)
+
+        http_requests_in_flight.inc()
+        try:
+            await self.app(scope, receive, send_with_request_id)
+        finally:
+            elapsed = time.perf_counter() - start
+            http_requests_in_flight.dec()
+            duration_ms = round(elapsed * 1000, 2)
+            route = route_template(scope)
+            http_request_duration.observe(elapsed, scope["method"], route, response["status"])
+            if self._should_log(route, response["status"], duration_ms):
+                access_logger.info("access", extra={"fields": {
+                    "request_id": request_id,
+                    "method": scope["method"],
+                    "path": scope["path"],
+                    "route": route,
+                    "status": response["status"],
+                    "duration_ms": duration_ms,
+                    "ttfb_ms": response["ttfb_ms"],
+                    "bytes": response["bytes"],
+                    "client": scope["client"][0] if scope.get("client") else None,
+                }})
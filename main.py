@@ -1,22 +1,61 @@
+import os
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, Request, Depends
-from fastapi.responses import JSONResponse, HTMLResponse
+from fastapi.responses import JSONResponse, HTMLResponse, ORJSONResponse
 from fastapi.templating import Jinja2Templates
 from auth.dependencies import get_current_user
 from dotenv import load_dotenv
 from log.logger import logger
-from log.middleware import log_middleware
-from starlette.middleware.base import BaseHTTPMiddleware
-from routes import auth, order, user, status, product, reporting
+from log.middleware import AccessLogMiddleware
+from utils.profiler import ProfilingMiddleware
+from routes import auth, order, user, status, product, admin
+from utils.api_client import start_client, close_client
+from utils.status_cache import status_cache
+from db.database import async_session_maker
+from utils.process_pool import PoolSaturatedError
+from utils.pagination import InvalidCursorError
+from auth.hashing import hashing_pool
+from auth.redis_client import start_redis, close_redis
+from auth.revocation import revocation_list
+from utils.pdf_renderer import load_template, pdf_pool
 
 import uvicorn
 
 # Load environment variables from .env file
 load_dotenv()
 
-app = FastAPI()
+# Reporting pulls in pandas and xhtml2pdf. Disable it here to serve it from reporting_app instead
+REPORTING_ENABLED = os.getenv("REPORTING_ENABLED", "true").lower() in ("1", "true", "yes")
 
-# Add our logging middleware
-app.add_middleware(BaseHTTPMiddleware, dispatch=log_middleware)
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Shared resources that live as long as the worker
+    await start_client()
+    await start_redis()
+    await revocation_list.start()
+    hashing_pool.start()
+    try:
+        async with async_session_maker() as session:
+            await status_cache.load(session)
+    except Exception as e:
+        # Loaded on first use instead
+        logger.warning(f"Could not preload statuses: {e}")
+    if REPORTING_ENABLED:
+        load_template()
+        pdf_pool.start()
+    yield
+    await close_client()
+    await revocation_list.stop()
+    await close_redis()
+    hashing_pool.shutdown()
+    pdf_pool.shutdown()
+
+# orjson encodes every JSON response, several times faster than the stdlib encoder on large bodies
+app = FastAPI(lifespan=lifespan, default_response_class=ORJSONResponse)
+
+# Add our logging middleware, outermost so profiles carry the request id
+app.add_middleware(ProfilingMiddleware)
+app.add_middleware(AccessLogMiddleware)
 
 logger.info('Starting API...')
 
@@ -29,7 +68,10 @@ app.include_router(product.router, prefix="/api/products", tags=["Products"])
 app.include_router(order.router, prefix="/api/orders", tags=["Orders"])
 app.include_router(user.router, prefix="/api/users", tags=["Users"])
 app.include_router(status.router, prefix="/api/status", tags=["Status"])
-app.include_router(reporting.router, prefix="/api/reporting", tags=["Reporting"])
+if REPORTING_ENABLED:
+    from routes import reporting
+    app.include_router(reporting.router, prefix="/api/reporting", tags=["Reporting"])
+app.include_router(admin.router, prefix="/api/admin", tags=["Admin"])
 
 @app.get("/", response_class=HTMLResponse)
 @app.get("/", response_class=HTMLResponse)
@@ -41,6 +83,19 @@ def read_root(request: Request):
 def protected_route(current_user: dict = Depends(get_current_user)):
     return {"message": "This is a protected route", "user": current_user}
 
+# Pools at capacity shed load instead of queueing without bound
+@app.exception_handler(PoolSaturatedError)
+async def pool_saturated_handler(request: Request, exc: PoolSaturatedError):
+    return JSONResponse(
+        status_code=503,
+        content={"detail": str(exc)},
+        headers={"Retry-After": "1"},
+    )
+
+@app.exception_handler(InvalidCursorError)
+async def invalid_cursor_handler(request: Request, exc: InvalidCursorError):
+    return JSONResponse(status_code=400, content={"detail": str(exc)})
+
 # Manejo de excepciones globales
 @app.exception_handler(Exception)
 async def global_exception_handler(request: Request, exc: Exception):
@@ -0,0 +1,38 @@
+from alembic import context
+from dotenv import load_dotenv
+from sqlalchemy import create_engine, pool
+from sqlmodel import SQLModel
+
+load_dotenv()
+
+from db.database import DATABASE_URL
+# Imported so their tables are registered in SQLModel.metadata for autogenerate
+from models import order, status, user  # noqa: F401
+
+config = context.config
+target_metadata = SQLModel.metadata
+
+def run_migrations_offline():
+    """Emit the SQL to stdout instead of running it (alembic upgrade head --sql)."""
+    context.configure(
+        url=DATABASE_URL,
+        target_metadata=target_metadata,
+        literal_binds=True,
+        dialect_opts={"paramstyle": "named"},
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+def run_migrations_online():
+    # A dedicated, unpooled connection: migrations run once and exit
+    connectable = create_engine(DATABASE_URL, poolclass=pool.NullPool)
+    with connectable.connect() as connection:
+        # Each revision commits on its own, so a failure leaves the earlier ones applied
+        context.configure(connection=connection, target_metadata=target_metadata, transaction_per_migration=True)
+        with context.begin_transaction():
+            context.run_migrations()
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
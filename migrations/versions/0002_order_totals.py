@@ -0,0 +1,41 @@
+"""order item_count and total
+
+Adding a column with a constant default is a catalog-only change in
+PostgreSQL 11+, and the indexes are built CONCURRENTLY, so this runs against
+a live table. Fill existing rows afterwards with backfill_order_totals.py.
+IF NOT EXISTS lets it run on databases that already got the columns from
+that script.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18 09:10:02.118240
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0002'
+down_revision: Union[str, Sequence[str], None] = '0001'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('order', sa.Column('item_count', sa.Integer(), server_default='0', nullable=False), if_not_exists=True)
+    op.add_column('order', sa.Column('total', sa.Float(), server_default='0', nullable=False), if_not_exists=True)
+    with op.get_context().autocommit_block():
+        op.create_index('ix_order_item_count', 'order', ['item_count'], postgresql_concurrently=True, if_not_exists=True)
+        op.create_index('ix_order_total', 'order', ['total'], postgresql_concurrently=True, if_not_exists=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_order_total', table_name='order', postgresql_concurrently=True, if_exists=True)
+        op.drop_index('ix_order_item_count', table_name='order', postgresql_concurrently=True, if_exists=True)
+    op.drop_column('order', 'total')
+    op.drop_column('order', 'item_count')
@@ -0,0 +1,49 @@
+"""hot path indexes
+
+- md5(refresh_token): refresh lookups compare a short hash instead of
+  scanning the table or indexing whole JWTs.
+- order.user_id and order.status_id: orders by user, ownership checks and
+  status filters.
+- (created_at, id) on user and order: keyset pagination sorted by creation date.
+
+Built CONCURRENTLY, outside a transaction, so writes keep flowing. If a build
+fails PostgreSQL leaves an INVALID index behind: drop it and run the upgrade
+again.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18 09:12:47.530918
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0003'
+down_revision: Union[str, Sequence[str], None] = '0002'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+INDEXES = [
+    ('ix_user_refresh_token_md5', 'user', [sa.text('md5(refresh_token)')]),
+    ('ix_order_user_id', 'order', ['user_id']),
+    ('ix_order_status_id', 'order', ['status_id']),
+    ('ix_order_created_at_id', 'order', ['created_at', 'id']),
+    ('ix_user_created_at_id', 'user', ['created_at', 'id']),
+]
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            op.create_index(name, table, columns, postgresql_concurrently=True, if_not_exists=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, _ in reversed(INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
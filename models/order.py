@@ -1,21 +1,37 @@
 from datetime import datetime
 from sqlalchemy.dialects.postgresql import JSONB
-from sqlalchemy import Column
+from sqlalchemy import Column, Index
 from sqlmodel import Relationship, SQLModel, Field
-from typing import Any, Dict, Optional
+from typing import Any, Dict, Literal, Optional
 
 class OrderBase(SQLModel):
     created_at: datetime
     products: Optional[list[Dict]] = Field(default=None, sa_column=Column(JSONB))
 
 class Order(OrderBase, table=True):
+    # Keyset pagination by creation date
+    __table_args__ = (Index("ix_order_created_at_id", "created_at", "id"),)
+
     id: int = Field(default=None, primary_key=True)
-    status_id: Optional[int] = Field(default=None, foreign_key="status.id")
-    user_id: int = Field(foreign_key="user.id")
+    status_id: Optional[int] = Field(default=None, foreign_key="status.id", index=True)
+    user_id: int = Field(foreign_key="user.id", index=True)
+    # Derived from products (units and value), kept in step by every write in crud.order
+    item_count: int = Field(default=0, index=True, sa_column_kwargs={"server_default": "0"})
+    total: float = Field(default=0, index=True, sa_column_kwargs={"server_default": "0"})
 
     user: "User" = Relationship(back_populates="order") # type: ignore
     status: Optional["Status"] = Relationship(back_populates="order") # type: ignore
 
+    # Read by OrderReadDetailed. Load the relationships with crud.order.with_order_details,
+    # async sessions cannot lazy load them
+    @property
+    def status_name(self) -> Optional[str]:
+        return self.status.name if self.status else None
+
+    @property
+    def user_name(self) -> Optional[str]:
+        return self.user.username if self.user else None
+
 class OrderCreate(OrderBase):
     user_name: str = Field(..., min_length=3, max_length=100, description="User name cant be empty")
 
@@ -23,3 +39,22 @@ class OrderRead(OrderBase):
     id: int
     status_id: Optional[int] = Field(default=None, foreign_key="status.id")
     user_id: int = Field(foreign_key="user.id")
+    item_count: int = 0
+    total: float = 0
+
+class OrderReadDetailed(OrderRead):
+    status_name: Optional[str] = None
+    user_name: Optional[str] = None
+
+class OrderItemAdd(SQLModel):
+    product_id: int
+    quantity: int
+
+class OrderItemResult(SQLModel):
+    product_id: int
+    quantity: int
+    status: Literal["added", "not_found", "invalid_quantity"]
+
+class OrderBulkAddResult(SQLModel):
+    order: OrderRead
+    items: list[OrderItemResult]
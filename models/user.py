@@ -1,5 +1,5 @@
 from datetime import datetime
-from sqlalchemy import ARRAY, Column, Integer
+from sqlalchemy import ARRAY, Column, Index, Integer, text
 from sqlmodel import Relationship, SQLModel, Field
 from typing import Optional
 from pydantic import EmailStr
@@ -10,6 +10,13 @@ class UserBase(SQLModel):
     role: str = Field(default="user")
 
 class User(UserBase, table=True):
+    __table_args__ = (
+        # Refresh lookups match on md5(refresh_token), much smaller than indexing the whole JWT
+        Index("ix_user_refresh_token_md5", text("md5(refresh_token)")),
+        # Keyset pagination by creation date
+        Index("ix_user_created_at_id", "created_at", "id"),
+    )
+
     id: int = Field(default=None, primary_key=True)
     refresh_token: Optional[str] = None
     hashed_password: str
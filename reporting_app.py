@@ -0,0 +1,41 @@
+"""Standalone app serving only the reporting routes.
+
+Lets report generation, with its pandas and xhtml2pdf footprint, be deployed
+and scaled apart from the main API (run main.py with REPORTING_ENABLED=false
+and route /api/reporting here):
+
+    uvicorn reporting_app:app --port 8001
+"""
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+from dotenv import load_dotenv
+from routes import reporting
+from utils.pdf_renderer import load_template, pdf_pool
+from utils.process_pool import PoolSaturatedError
+
+import uvicorn
+
+load_dotenv()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    load_template()
+    pdf_pool.start()
+    yield
+    pdf_pool.shutdown()
+
+app = FastAPI(lifespan=lifespan)
+
+app.include_router(reporting.router, prefix="/api/reporting", tags=["Reporting"])
+
+@app.exception_handler(PoolSaturatedError)
+async def pool_saturated_handler(request: Request, exc: PoolSaturatedError):
+    return JSONResponse(
+        status_code=503,
+        content={"detail": str(exc)},
+        headers={"Retry-After": "1"},
+    )
+
+if __name__ == "__main__":
+    uvicorn.run("reporting_app:app", host="0.0.0.0", port=8001, reload=True)
@@ -0,0 +1,71 @@
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import PlainTextResponse
+from auth.dependencies import require_role
+from auth.hashing import hashing_pool
+from auth.jwt import token_validation_stats
+from auth.redis_client import redis_status
+from db.database import get_pool_status
+from utils.api_client import catalog_cache
+from utils.metrics import CONTENT_TYPE, render_metrics
+from utils.pdf_renderer import pdf_stats
+from utils.profiler import profile_store
+from utils.report_cache import report_cache
+from utils.status_cache import status_cache
+
+router = APIRouter()
+
+@router.get("/catalog-cache")
+def read_catalog_cache_stats(current_user: dict = Depends(require_role("admin"))):
+    return catalog_cache.stats()
+
+@router.get("/hashing-pool")
+def read_hashing_pool_stats(current_user: dict = Depends(require_role("admin"))):
+    return hashing_pool.stats()
+
+@router.get("/pdf-pool")
+def read_pdf_pool_stats(current_user: dict = Depends(require_role("admin"))):
+    return pdf_stats()
+
+@router.get("/db-pool")
+def read_db_pool_stats(current_user: dict = Depends(require_role("admin"))):
+    return get_pool_status()
+
+@router.get("/report-cache")
+def read_report_cache_stats(current_user: dict = Depends(require_role("admin"))):
+    return report_cache.stats()
+
+@router.get("/redis")
+def read_redis_stats(current_user: dict = Depends(require_role("admin"))):
+    return redis_status()
+
+@router.get("/token-validation")
+def read_token_validation_stats(current_user: dict = Depends(require_role("admin"))):
+    return token_validation_stats()
+
+@router.get("/status-cache")
+def read_status_cache_stats(current_user: dict = Depends(require_role("admin"))):
+    return status_cache.stats()
+
+# async so the threadpool gauges can be read from the event loop
+@router.get("/metrics", response_class=PlainTextResponse)
+async def read_metrics(current_user: dict = Depends(require_role("admin"))):
+    return PlainTextResponse(render_metrics(), media_type=CONTENT_TYPE)
+
+@router.get("/profiles")
+def read_profiles(current_user: dict = Depends(require_role("admin"))):
+    return profile_store.list()
+
+def _get_profile(profile_id: str):
+    profile = profile_store.get(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail=f"Profile with ID {profile_id} not found")
+    return profile
+
+@router.get("/profiles/{profile_id}")
+def read_profile(profile_id: str, current_user: dict = Depends(require_role("admin"))):
+    profile = _get_profile(profile_id)
+    return {**profile.summary(), "call_tree": profile.call_tree()}
+
+@router.get("/profiles/{profile_id}/folded", response_class=PlainTextResponse)
+def read_profile_folded(profile_id: str, current_user: dict = Depends(require_role("admin"))):
+    return _get_profile(profile_id).folded()
@@ -1,56 +1,108 @@
 from datetime import datetime
-from fastapi import APIRouter, Depends, HTTPException, Body
-from sqlmodel import Session
+from typing import Literal, Optional
+from fastapi import APIRouter, Depends, HTTPException, Body, Query, Request, Response
+from sqlmodel.ext.asyncio.session import AsyncSession
 from db.database import get_session
-from models.order import Order, OrderCreate, OrderRead
-from crud.user import get_user_by_name
+from models.order import Order, OrderCreate, OrderRead, OrderReadDetailed
+from crud.user import get_user_by_name_async
 from crud.order import (
-    create_order,
-    get_orders,
-    get_order_by_id,
-    get_orders_by_user_name,
-    update_order_by_id,
-    delete_order_by_id
+    create_order_async,
+    get_order_rows_page_async,
+    orders_statement,
+    get_order_by_id_async,
+    get_order_detailed_async,
+    get_order_version_async,
+    get_orders_by_user_name_async,
+    update_order_by_id_async,
+    delete_order_by_id_async,
 )
 from auth.dependencies import get_current_user, require_ownership_or_admin, require_role  # Import role-based dependency
+from utils.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, NEXT_CURSOR_HEADER, PageParams, keyset_statement, rows_response
+from utils.http_cache import ORDER_HTTP_MAX_AGE, cache_control, conditional_response, make_etag
+from utils.streaming import NDJSON_MEDIA_TYPE, stream_ndjson, wants_ndjson
 
 router = APIRouter()
 
+ORDER_CACHE_HEADERS = cache_control(ORDER_HTTP_MAX_AGE, private=True)
+
+class OrderPageParams(PageParams):
+    """Listing parameters for orders, which can also be sorted by value."""
+
+    def __init__(
+        self,
+        limit: int = Query(DEFAULT_PAGE_SIZE, gt=0, le=MAX_PAGE_SIZE),
+        cursor: Optional[str] = Query(None, description=f"Opaque token from the {NEXT_CURSOR_HEADER} header of the previous page"),
+        order_by: Literal["id", "created_at", "total"] = Query("id"),
+        descending: bool = Query(False),
+    ):
+        super().__init__(limit, cursor, order_by, descending)
+
 @router.post("/", response_model=OrderRead)
-def create(order: OrderCreate, session: Session = Depends(get_session), current_user: dict = Depends(get_current_user)):
-    user = get_user_by_name(session, order.user_name)
+async def create(order: OrderCreate, session: AsyncSession = Depends(get_session), current_user: dict = Depends(get_current_user)):
+    user = await get_user_by_name_async(session, order.user_name)
     if not user:
         raise HTTPException(status_code=404, detail=f"User with name '{order.user_name}' not found")
     
     require_ownership_or_admin(user.id, current_user)
     
     order_data = Order(**order.model_dump(exclude={"user_name", "products"}), user_id=user.id, status_id=1, products=None)
-    created_order = create_order(session, order_data)
-    session.refresh(created_order)  # Refresh to load relationships
+    created_order = await create_order_async(session, order_data)
+    await session.refresh(created_order)  # Refresh to load relationships
     return created_order
 
-@router.get("/", response_model=list[OrderRead])
-def read_all(session: Session = Depends(get_session), current_user: dict = Depends(require_role("admin"))):
-    return get_orders(session)
+@router.get("/", response_model=list[OrderReadDetailed], responses={200: {"content": {NDJSON_MEDIA_TYPE: {}}}})
+async def read_all(
+    request: Request,
+    page: OrderPageParams = Depends(),
+    status_id: Optional[int] = Query(None),
+    user_id: Optional[int] = Query(None),
+    created_from: Optional[datetime] = Query(None),
+    created_to: Optional[datetime] = Query(None),
+    min_total: Optional[float] = Query(None),
+    max_total: Optional[float] = Query(None),
+    session: AsyncSession = Depends(get_session),
+    current_user: dict = Depends(require_role("admin"))
+):
+    # Bulk export: every matching row from the cursor on, ignoring the page size
+    if wants_ndjson(request):
+        statement = keyset_statement(
+            orders_statement(status_id, user_id, created_from, created_to, min_total, max_total), Order, page.cursor, page.order_by, page.descending
+        )
+        return stream_ndjson(statement, Order)
+    # Plain rows straight from the query, encoded without building and validating models
+    orders, next_cursor = await get_order_rows_page_async(
+        session, page.limit, page.cursor, page.order_by, page.descending,
+        status_id, user_id, created_from, created_to, min_total, max_total
+    )
+    return rows_response(orders, next_cursor)
 
-@router.get("/{order_id}", response_model=OrderRead)
-def read_by_id(order_id: int, session: Session = Depends(get_session), current_user: dict = Depends(get_current_user)):
-    order = get_order_by_id(session, order_id)
+@router.get("/{order_id}", response_model=OrderReadDetailed)
+async def read_by_id(order_id: int, request: Request, response: Response, session: AsyncSession = Depends(get_session), current_user: dict = Depends(get_current_user)):
+    # Ownership is checked on the version row too, a 304 must not confirm someone else's order
+    version = await get_order_version_async(session, order_id)
+    if not version:
+        raise HTTPException(status_code=404, detail=f"No orders found for {order_id}")
+    version, user_id = version
+    require_ownership_or_admin(user_id, current_user)
+    unchanged = conditional_response(request, response, make_etag(f"order-{order_id}-{version}"), ORDER_CACHE_HEADERS)
+    if unchanged:
+        return unchanged
+    order = await get_order_detailed_async(session, order_id)
     if not order:
         raise HTTPException(status_code=404, detail=f"No orders found for {order_id}")
     require_ownership_or_admin(order.user_id, current_user)
     return order
 
-@router.get("/user/{user_name}", response_model=list[OrderRead])
-def read_by_name(user_name: str, session: Session = Depends(get_session), current_user: dict = Depends(get_current_user)):
-    orders = get_orders_by_user_name(session, user_name)
+@router.get("/user/{user_name}", response_model=list[OrderReadDetailed])
+async def read_by_name(user_name: str, session: AsyncSession = Depends(get_session), current_user: dict = Depends(get_current_user)):
+    orders = await get_orders_by_user_name_async(session, user_name)
     if not orders:
         raise HTTPException(status_code=404, detail=f"No orders found for user '{user_name}'")
     require_ownership_or_admin(orders[0].user_id, current_user)
     return orders
 
 @router.put("/{order_id}", response_model=Order)
-def update_by_id(
+async def update_by_id(
     order_id: int,
     order_data: dict = Body(examples=[
         {
@@ -66,19 +118,19 @@ def update_by_id(
             ]
         }
     ]),
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_session),
     current_user: dict = Depends(require_role("admin"))
 ):
-    order = get_order_by_id(session, order_id)
+    order = await get_order_by_id_async(session, order_id)
     if not order:
         raise HTTPException(status_code=404, detail=f"Order with ID {order_id} not found")
     
-    updated_order = update_order_by_id(session, order_id, order_data)
+    updated_order = await update_order_by_id_async(session, order_id, order_data)
     return updated_order
 
 @router.delete("/{order_id}", response_model=Order)
-def delete_by_id(order_id: int, session: Session = Depends(get_session), current_user: dict = Depends(require_role("admin"))):
-    deleted_order = delete_order_by_id(session, order_id)
+async def delete_by_id(order_id: int, session: AsyncSession = Depends(get_session), current_user: dict = Depends(require_role("admin"))):
+    deleted_order = await delete_order_by_id_async(session, order_id)
     if not deleted_order:
         raise HTTPException(status_code=404, detail=f"Order with ID {order_id} not found")
     return deleted_order
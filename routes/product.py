@@ -1,17 +1,21 @@
 from typing import Optional
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlmodel import Session
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from sqlmodel.ext.asyncio.session import AsyncSession
 from auth.dependencies import get_current_user, require_ownership_or_admin
-from crud.order import get_order_by_id, update_order_by_id
+from crud.order import add_products_to_order_async, get_order_by_id_async, remove_product_from_order_async, set_product_quantity_async
 from db.database import get_session
-from models.order import OrderRead
-from utils.api_client import fetch_product_data  # Importar la función desde el archivo auxiliar
-import copy
+from models.order import OrderBulkAddResult, OrderItemAdd, OrderItemResult, OrderRead
+from utils.http_cache import PRODUCTS_HTTP_MAX_AGE, cache_control, conditional_response, make_etag
+from utils.api_client import get_catalog_index, get_catalog_version  # Importar la función desde el archivo auxiliar
 
 router = APIRouter()
 
+PRODUCTS_CACHE_HEADERS = cache_control(PRODUCTS_HTTP_MAX_AGE)
+
 @router.get("/", response_model=list[dict])
 async def get_all_products(
+        request: Request,
+        response: Response,
         id: Optional[int] = Query(None),
         title: Optional[str] = Query(None, description="Filter by product title"),
         min_price: Optional[float] = Query(None),
@@ -25,79 +29,115 @@ async def get_all_products(
         limit: Optional[int] = Query(None)
     ):
     try:
-        product_data = await fetch_product_data()
-
-        filtered = product_data.get("products")
-
-        if skip is not None and limit is not None:
-            filtered = filtered[skip:skip+limit]
-        if title:
-            filtered = [p for p in filtered if title.lower() in p.get("title", "").lower()]
-        if category:
-            filtered = [p for p in filtered if p.get("category", "").lower() == category.lower()]
-        if tag:
-            filtered = [p for p in filtered if tag.lower() in [t.lower() for t in p.get("tags", [])]]
-        if brand:
-            filtered = [p for p in filtered if p.get("brand", "").lower() == brand.lower()]
-        if min_price is not None:
-            filtered = [p for p in filtered if isinstance(p.get("price"), (int, float)) and p["price"] >= min_price]
-        if max_price is not None:
-            filtered = [p for p in filtered if isinstance(p.get("price"), (int, float)) and p["price"] <= max_price]
-
-        if sort_by:
-            reverse = sort_order == "desc"
-            try:
-                filtered.sort(key=lambda p: p.get(sort_by, 0), reverse=reverse)
-            except TypeError:
-                raise HTTPException(status_code=400, detail=f"Cannot sort by field: {sort_by}")
-            
-        if id:
-            for p in filtered:
-                if p.get("id", "") == id:
-                    return [p]
+        catalog = await get_catalog_index()
+        # Same catalog, same answer for the same query: revalidate before searching
+        etag = make_etag(f"catalog-{get_catalog_version()}")
+        unchanged = conditional_response(request, response, etag, PRODUCTS_CACHE_HEADERS)
+        if unchanged:
+            return unchanged
+        try:
+            filtered = catalog.search(
+                id=id, title=title, min_price=min_price, max_price=max_price,
+                category=category, tag=tag, brand=brand,
+                sort_by=sort_by, sort_order=sort_order, skip=skip, limit=limit
+            )
+        except TypeError:
+            raise HTTPException(status_code=400, detail=f"Cannot sort by field: {sort_by}")
+
+        if id is not None and not filtered:
             raise HTTPException(status_code=404, detail=f"Product with ID {id} not found")
 
         return filtered
+    except HTTPException:
+        raise
     except Exception as e:
         return {"error": str(e)}
 
+async def _get_open_order(session: AsyncSession, order_id: int, current_user: dict):
+    order = await get_order_by_id_async(session, order_id)
+    if not order:
+        raise HTTPException(status_code=404, detail=f"Order with ID {order_id} not found")
+
+    require_ownership_or_admin(order.user_id, current_user)
+
+    if order.status_id != 1: # Check if order is already placed
+        raise HTTPException(status_code=403, detail=f"Order with ID {order_id} is already placed!")
+    return order
+
+def _require_product_in_order(order, product_id: int):
+    if not any(product.get("id") == product_id for product in order.products or []):
+        raise HTTPException(status_code=404, detail=f"Product with ID {product_id} not found in order {order.id}")
+
+def _updated_or_conflict(updated_order, order_id: int):
+    # The checks above passed, so the order was placed, deleted or changed by another request meanwhile
+    if not updated_order:
+        raise HTTPException(status_code=409, detail=f"Order with ID {order_id} changed during the update, try again")
+    return updated_order
+
 @router.post("/order", response_model=OrderRead)
-async def add_product_by_id(order_id:int, product_id: int, product_quantity:int = Query(gt=0), session: Session = Depends(get_session), current_user: dict = Depends(get_current_user)):
-    product_data = await fetch_product_data()
-    filtered = product_data.get("products")
-    for p in filtered:
-        if p.get("id", "") == product_id:
-            order = get_order_by_id(session, order_id)
-            if not order:
-                raise HTTPException(status_code=404, detail=f"Order with ID {order_id} not found")
-            
-            require_ownership_or_admin(order.user_id, current_user)
-
-            if order.status_id != 1: # Check if order is already placed
-                raise HTTPException(status_code=403, detail=f"Order with ID {order_id} is already placed!")
-
-            updated_products = copy.deepcopy(order.products) if order.products else []
-
-            # Flag to track if product exists
-            product_found = False
-
-            for i, product in enumerate(updated_products):
-                if p.get("id", "") == product.get("id", ""):
-                    updated_products[i]["title"] = p.get("title")
-                    updated_products[i]["quantity"] += product_quantity
-                    updated_products[i]["price"] = p.get("price")
-                    product_found = True
-                    break
-
-            # If product is not already in the list, append it
-            if not product_found:
-                updated_products.append({
-                    "id": p.get("id"),
-                    "title": p.get("title"),
-                    "quantity": product_quantity,
-                    "price": p.get("price")
-                })
-
-            updated_order = update_order_by_id(session, order_id, {"products": updated_products})
-            return updated_order
-    raise HTTPException(status_code=404, detail=f"Product with ID {product_id} not found")
\ No newline at end of file
+async def add_product_by_id(order_id:int, product_id: int, product_quantity:int = Query(gt=0), session: AsyncSession = Depends(get_session), current_user: dict = Depends(get_current_user)):
+    catalog = await get_catalog_index()
+    p = catalog.get(product_id)
+    if not p:
+        raise HTTPException(status_code=404, detail=f"Product with ID {product_id} not found")
+
+    await _get_open_order(session, order_id, current_user)
+
+    # Merged into the order by a single UPDATE: adds to the quantity if the product is already there
+    item = {
+        "id": p.get("id"),
+        "title": p.get("title"),
+        "quantity": product_quantity,
+        "price": p.get("price")
+    }
+    updated_order = await add_products_to_order_async(session, order_id, [item])
+    return _updated_or_conflict(updated_order, order_id)
+
+@router.post("/order/bulk", response_model=OrderBulkAddResult)
+async def add_products_bulk(order_id: int, items: list[OrderItemAdd], session: AsyncSession = Depends(get_session), current_user: dict = Depends(get_current_user)):
+    if not items:
+        raise HTTPException(status_code=422, detail="No products to add")
+
+    catalog = await get_catalog_index()
+    order = await _get_open_order(session, order_id, current_user)
+
+    # Items are checked one by one; valid ones for the same product are merged into one line
+    results = []
+    merged: dict[int, dict] = {}
+    for entry in items:
+        p = catalog.get(entry.product_id)
+        if entry.quantity <= 0:
+            status = "invalid_quantity"
+        elif not p:
+            status = "not_found"
+        else:
+            status = "added"
+            item = merged.setdefault(entry.product_id, {
+                "id": p.get("id"),
+                "title": p.get("title"),
+                "quantity": 0,
+                "price": p.get("price")
+            })
+            item["quantity"] += entry.quantity
+        results.append(OrderItemResult(product_id=entry.product_id, quantity=entry.quantity, status=status))
+
+    # All accepted items go in with a single UPDATE
+    if merged:
+        order = _updated_or_conflict(await add_products_to_order_async(session, order_id, list(merged.values())), order_id)
+    return OrderBulkAddResult(order=order, items=results)
+
+@router.put("/order", response_model=OrderRead)
+async def set_product_quantity(order_id: int, product_id: int, product_quantity: int = Query(gt=0), session: AsyncSession = Depends(get_session), current_user: dict = Depends(get_current_user)):
+    order = await _get_open_order(session, order_id, current_user)
+    _require_product_in_order(order, product_id)
+
+    updated_order = await set_product_quantity_async(session, order_id, product_id, product_quantity)
+    return _updated_or_conflict(updated_order, order_id)
+
+@router.delete("/order", response_model=OrderRead)
+async def remove_product_by_id(order_id: int, product_id: int, session: AsyncSession = Depends(get_session), current_user: dict = Depends(get_current_user)):
+    order = await _get_open_order(session, order_id, current_user)
+    _require_product_in_order(order, product_id)
+
+    updated_order = await remove_product_from_order_async(session, order_id, product_id)
+    return _updated_or_conflict(updated_order, order_id)
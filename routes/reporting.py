@@ -1,51 +1,126 @@
+import asyncio
 import copy
+import time
 from datetime import datetime
-from fastapi import APIRouter, Depends, HTTPException, Response
-from sqlmodel import Session
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from sqlmodel.ext.asyncio.session import AsyncSession
+from starlette.concurrency import run_in_threadpool
 import uvicorn
-import pandas as pd
 from io import BytesIO
-from jinja2 import Template
-from xhtml2pdf import pisa
-from pathlib import Path
+from typing import TYPE_CHECKING
 
 from auth.dependencies import get_current_user, require_ownership_or_admin
-from crud.order import get_order_by_id
-from crud.status import get_status_by_id
+from crud.order import get_order_by_id_async, get_order_detailed_async
 from db.database import get_session
+from utils.pdf_renderer import render_html, render_pdf
+from utils.http_cache import etag_matches, make_etag, not_modified
+from utils.metrics import report_build_duration
+from utils.report_cache import report_cache, report_fingerprint
+
+if TYPE_CHECKING:
+    import pandas as pd
 
 router = APIRouter()
 
-@router.get("/reporting/excel/{order_id}")
-def get_order_excel(order_id: int, session: Session = Depends(get_session), current_user: dict = Depends(get_current_user)):
-    order = get_order_by_id(session, order_id)
-    if not order:
-        raise HTTPException(status_code=404, detail=f"Order with ID {order_id} not found")
+# Report builders are CPU-bound: Excel and CSV run in the threadpool, PDFs in a process pool.
+# pandas is imported on first use so workers that never build a report don't pay for it
 
-    require_ownership_or_admin(order.user_id, current_user)
+def _order_dataframe(products: list[dict]) -> "pd.DataFrame":
+    import pandas as pd
 
-    if not order.products:
-        raise HTTPException(status_code=422, detail=f"Order with ID {order_id} has no products")
+    df = pd.DataFrame(products)
+    df["subtotal"] = df["price"] * df["quantity"]
+    return df[["id", "title", "price", "quantity", "subtotal"]]
+
+def build_order_excel(products: list[dict]) -> bytes:
+    import pandas as pd
 
     buffer = BytesIO()
-    df = pd.DataFrame(order.products)
-    df["subtotal"] = df["price"] * df["quantity"]
-    df = df[["id", "title", "price", "quantity", "subtotal"]]
+    df = _order_dataframe(products)
     df.loc[len(df)] = ['', '', '', 'Total', df["subtotal"].sum()]
 
     with pd.ExcelWriter(buffer, engine="xlsxwriter") as writer:
         df.to_excel(writer, index=True, sheet_name="Order Data")
     buffer.seek(0)
-    # Enviar el archivo Excel al cliente
+    return buffer.getvalue()
+
+def build_order_csv(products: list[dict]) -> bytes:
+    # Generar el archivo CSV en memoria
+    buffer = BytesIO()
+    df = _order_dataframe(products)
+    df.to_csv(buffer, index=False)
+    buffer.seek(0)
+    return buffer.getvalue()
+
+def build_order_html(products: list[dict], order_id: int, order_status: str) -> str:
+    df = _order_dataframe(products)
+    order_rows = list(zip(
+        df["id"].values,
+        df["title"].values,
+        df["price"].values,
+        df["quantity"].values,
+        df["subtotal"].values
+    ))
+
+    order_total = df["subtotal"].sum()
+    return render_html(rows=order_rows, id=order_id, status=order_status, total=order_total)
+
+async def build_order_pdf(products: list[dict], order_id: int, order_status: str) -> bytes | None:
+    # La plantilla se compila una sola vez; el HTML se arma en el threadpool y el PDF se genera en el pool de procesos
+    rendered_html = await run_in_threadpool(build_order_html, products, order_id, order_status)
+    return await render_pdf(rendered_html)
+
+# Clients may keep reports but must revalidate, which costs a 304 while the order is unchanged
+REPORT_CACHE_HEADERS = {"Cache-Control": "private, no-cache"}
+
+async def _report_response(request: Request, order, fmt: str, status: str | None, media_type: str, filename: str, build) -> Response | None:
+    """Answer from the client's ETag or the report cache, awaiting `build()` only on a miss.
+
+    Returns None when the builder fails.
+    """
+    fingerprint = report_fingerprint(order.id, fmt, order.products, status)
+    etag = make_etag(fingerprint)
+    if etag_matches(request, etag):
+        return not_modified(etag, REPORT_CACHE_HEADERS)
+
+    key = report_cache.key(order.id, fmt, fingerprint)
+    content = await report_cache.get(key)
+    if content is None:
+        start = time.perf_counter()
+        content = await build()
+        report_build_duration.observe(time.perf_counter() - start, fmt)
+        if content is None:
+            return None
+        await report_cache.put(key, content)
+
     return Response(
-        buffer.getvalue(),
-        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        headers={"Content-Disposition": f"attachment; filename=order_data_{order_id}_{datetime.today().date()}.xlsx"}
+        content,
+        media_type=media_type,
+        headers={"Content-Disposition": f"attachment; filename={filename}", "ETag": etag, **REPORT_CACHE_HEADERS}
+    )
+
+@router.get("/reporting/excel/{order_id}")
+async def get_order_excel(order_id: int, request: Request, session: AsyncSession = Depends(get_session), current_user: dict = Depends(get_current_user)):
+    order = await get_order_by_id_async(session, order_id)
+    if not order:
+        raise HTTPException(status_code=404, detail=f"Order with ID {order_id} not found")
+
+    require_ownership_or_admin(order.user_id, current_user)
+
+    if not order.products:
+        raise HTTPException(status_code=422, detail=f"Order with ID {order_id} has no products")
+
+    # Enviar el archivo Excel al cliente
+    return await _report_response(
+        request, order, "xlsx", None,
+        "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+        f"order_data_{order_id}_{datetime.today().date()}.xlsx",
+        lambda: run_in_threadpool(build_order_excel, order.products)
     )
 
 @router.get("/reporting/csv/{order_id}")
-async def get_order_csv(order_id: int, session: Session = Depends(get_session), current_user: dict = Depends(get_current_user)):
-    order = get_order_by_id(session, order_id)
+async def get_order_csv(order_id: int, request: Request, session: AsyncSession = Depends(get_session), current_user: dict = Depends(get_current_user)):
+    order = await get_order_by_id_async(session, order_id)
     if not order:
         raise HTTPException(status_code=404, detail=f"Order with ID {order_id} not found")
 
@@ -54,66 +129,36 @@ async def get_order_csv(order_id: int, session: Session = Depends(get_session),
     if not order.products:
         raise HTTPException(status_code=422, detail=f"Order with ID {order_id} has no products")
 
-    # Generar el archivo CSV en memoria
-    buffer = BytesIO()
-    df = pd.DataFrame(order.products)
-    df["subtotal"] = df["price"] * df["quantity"]
-    df = df[["id", "title", "price", "quantity", "subtotal"]]
-    df.to_csv(buffer, index=False)
-    buffer.seek(0)
     # Enviar el archivo CSV al cliente
-    return Response(
-        buffer.getvalue(),
-        media_type="text/csv",
-        headers={"Content-Disposition": f"attachment; filename=order_data_{order_id}_{datetime.today().date()}.csv"}
+    return await _report_response(
+        request, order, "csv", None, "text/csv",
+        f"order_data_{order_id}_{datetime.today().date()}.csv",
+        lambda: run_in_threadpool(build_order_csv, order.products)
     )
 
 @router.get("/reporting/pdf/{order_id}")
-async def get_order_pdf(order_id: int, session: Session = Depends(get_session), current_user: dict = Depends(get_current_user)):
-    order = get_order_by_id(session, order_id)
+async def get_order_pdf(order_id: int, request: Request, session: AsyncSession = Depends(get_session), current_user: dict = Depends(get_current_user)):
+    # The status name comes with the order, in the same query
+    order = await get_order_detailed_async(session, order_id)
     if not order:
         raise HTTPException(status_code=404, detail=f"Order with ID {order_id} not found")
-    
+
     require_ownership_or_admin(order.user_id, current_user)
 
     if not order.products:
         raise HTTPException(status_code=422, detail=f"Order with ID {order_id} has no products")
-    
-    # Cargar la plantilla HTML desde el archivo externo
-    template_path = Path("templates/pdf_template.html")
-    html_template = template_path.read_text(encoding="utf-8")
-    template = Template(html_template)
-        
-    df = pd.DataFrame(order.products)
-    df["subtotal"] = df["price"] * df["quantity"]
-    df = df[["id", "title", "price", "quantity", "subtotal"]]
-    order_rows = list(zip(
-        df["id"].values,
-        df["title"].values,
-        df["price"].values,
-        df["quantity"].values,
-        df["subtotal"].values
-    ))
-    
-    order_status = 'Unknown'
-    if order.status_id:
-        status = get_status_by_id(session, order.status_id)
-        if status:
-            order_status = status.name
 
-    order_total = df["subtotal"].sum()
-    rendered_html = template.render(rows=order_rows, id=order_id, status=order_status, total=order_total)
-    
-    # Convertir el HTML a PDF con xhtml2pdf
-    pdf_buffer = BytesIO()
-    pisa_status = pisa.CreatePDF(rendered_html, dest=pdf_buffer)
-    if pisa_status.err:
-        return {"error": "Error al generar el PDF"}
-    pdf_buffer.seek(0)
-    
+    order_status = order.status_name or 'Unknown'
+
     # Enviar el archivo PDF al cliente
-    return Response(
-        pdf_buffer.getvalue(),
-        media_type="application/pdf",
-        headers={"Content-Disposition": f"attachment; filename=order_data_{order_id}_{datetime.today().date()}.csv.pdf"}
-    )
\ No newline at end of file
+    try:
+        response = await _report_response(
+            request, order, "pdf", order_status, "application/pdf",
+            f"order_data_{order_id}_{datetime.today().date()}.csv.pdf",
+            lambda: build_order_pdf(order.products, order_id, order_status)
+        )
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=504, detail="PDF generation timed out")
+    if response is None:
+        return {"error": "Error al generar el PDF"}
+    return response
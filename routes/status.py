@@ -1,47 +1,62 @@
-from fastapi import APIRouter, Depends, HTTPException, Body
-from sqlmodel import Session
+from fastapi import APIRouter, Depends, HTTPException, Body, Request, Response
+from sqlmodel.ext.asyncio.session import AsyncSession
 
 from db.database import get_session
 from models.status import Status, StatusCreate, StatusRead
 from crud.status import (
-    create_status,
-    delete_status_by_id,
-    get_status_by_id,
-    get_status_by_name,
-    get_status,
-    update_status_by_id
+    create_status_async,
+    delete_status_by_id_async,
+    get_status_snapshot_async,
+    update_status_by_id_async,
 )
 from auth.dependencies import get_current_user, require_role  # Import role-based dependency
+from utils.http_cache import STATUS_HTTP_MAX_AGE, cache_control, conditional_response, make_etag
 
 router = APIRouter()
 
+STATUS_CACHE_HEADERS = cache_control(STATUS_HTTP_MAX_AGE)
+
 @router.post("/", response_model=StatusRead)
-def create(status: StatusCreate, session: Session = Depends(get_session), current_user: dict = Depends(require_role("admin"))):
+async def create(status: StatusCreate, session: AsyncSession = Depends(get_session), current_user: dict = Depends(require_role("admin"))):
     status_data = Status(**status.model_dump())
-    created_status = create_status(session, status_data)
-    session.refresh(created_status)  # Refresh to load relationships
+    created_status = await create_status_async(session, status_data)
+    await session.refresh(created_status)  # Refresh to load relationships
     return created_status
 
+# Reads are revalidated against the hash of the cached snapshot, a 304 never touches the database
+
 @router.get("/", response_model=list[StatusRead])
-def read_all(session: Session = Depends(get_session)):
-    return get_status(session)
+async def read_all(request: Request, response: Response, session: AsyncSession = Depends(get_session)):
+    snapshot = await get_status_snapshot_async(session)
+    unchanged = conditional_response(request, response, make_etag(f"statuses-{snapshot.etag}"), STATUS_CACHE_HEADERS)
+    if unchanged:
+        return unchanged
+    return list(snapshot.statuses)
 
 @router.get("/{status_id}", response_model=StatusRead)
-def read_by_id(status_id: int, session: Session = Depends(get_session)):
-    status = get_status_by_id(session, status_id)
+async def read_by_id(status_id: int, request: Request, response: Response, session: AsyncSession = Depends(get_session)):
+    snapshot = await get_status_snapshot_async(session)
+    status = snapshot.by_id.get(status_id)
     if not status:
         raise HTTPException(status_code=404, detail=f"Task with ID {status_id} not found")
+    unchanged = conditional_response(request, response, make_etag(f"status-{status_id}-{snapshot.etag}"), STATUS_CACHE_HEADERS)
+    if unchanged:
+        return unchanged
     return status
 
 @router.get("/name/{name}", response_model=StatusRead)
-def read_by_title(name: str, session: Session = Depends(get_session)):
-    status = get_status_by_name(session, name)
+async def read_by_title(name: str, request: Request, response: Response, session: AsyncSession = Depends(get_session)):
+    snapshot = await get_status_snapshot_async(session)
+    status = snapshot.by_name.get(name)
     if not status:
         raise HTTPException(status_code=404, detail=f"Statys with name '{name}' not found")
+    unchanged = conditional_response(request, response, make_etag(f"status-{status.id}-{snapshot.etag}"), STATUS_CACHE_HEADERS)
+    if unchanged:
+        return unchanged
     return status
 
 @router.put("/{status_id}", response_model=Status)
-def update_by_id(
+async def update_by_id(
     status_id: int,
     status_data: dict = Body(
         ...,
@@ -52,17 +67,17 @@ def update_by_id(
             }
         ]
     ),
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_session),
     current_user: dict = Depends(require_role("admin"))
 ):
-    updated_status = update_status_by_id(session, status_id, status_data)
+    updated_status = await update_status_by_id_async(session, status_id, status_data)
     if not updated_status:
         raise HTTPException(status_code=404, detail=f"Task with ID {status_id} not found")
     return updated_status
 
 @router.delete("/{status_id}", response_model=Status)
-def delete_by_id(status_id: int, session: Session = Depends(get_session), current_user: dict = Depends(require_role("admin"))):
-    deleted_status = delete_status_by_id(session, status_id)
+async def delete_by_id(status_id: int, session: AsyncSession = Depends(get_session), current_user: dict = Depends(require_role("admin"))):
+    deleted_status = await delete_status_by_id_async(session, status_id)
     if not deleted_status:
         raise HTTPException(status_code=404, detail=f"Status with ID {status_id} not found")
     return deleted_status
\ No newline at end of file
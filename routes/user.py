@@ -1,64 +1,102 @@
 from datetime import datetime
-from fastapi import APIRouter, Depends, HTTPException, Body
-from sqlmodel import Session
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Body, Query, Request, Response
+from sqlmodel.ext.asyncio.session import AsyncSession
 from auth.dependencies import get_current_user, require_ownership_or_admin, require_role
 from db.database import get_session
 from models.user import User, UserCreate, UserRead
-from auth.hashing import hash_password
+from auth.hashing import hash_password_async
+from utils.pagination import PageParams, keyset_statement, rows_response
+from utils.http_cache import USER_HTTP_MAX_AGE, cache_control, conditional_response, make_etag
+from utils.streaming import NDJSON_MEDIA_TYPE, stream_ndjson, wants_ndjson
 from crud.user import (
-    create_user,
-    get_all_users_wp,
-    get_user_by_mail,
-    get_all_users,
-    get_user_by_id,
-    get_user_by_name,
-    update_user_by_id,
-    delete_user_by_id,
-    update_user_by_name,
-    delete_user_by_name,
+    create_user_async,
+    get_all_users_wp_async,
+    get_user_by_mail_async,
+    get_user_rows_page_async,
+    users_statement,
+    get_user_by_id_async,
+    get_user_version_async,
+    get_user_by_name_async,
+    update_user_by_id_async,
+    delete_user_by_id_async,
+    update_user_by_name_async,
+    delete_user_by_name_async,
 )
 
 router = APIRouter()
 
+USER_CACHE_HEADERS = cache_control(USER_HTTP_MAX_AGE, private=True)
+
 @router.post("/", response_model=User)
-def create(user: UserCreate, session: Session = Depends(get_session), current_user: dict = Depends(require_role("admin"))):
+async def create(user: UserCreate, session: AsyncSession = Depends(get_session), current_user: dict = Depends(require_role("admin"))):
     user_data = User(**user.model_dump(exclude={"password"}), 
-                        hashed_password=hash_password(user.password), 
+                        hashed_password=await hash_password_async(user.password), 
                         created_at=datetime.now(), 
                         role=user.role)
-    return create_user(session, user_data)
+    return await create_user_async(session, user_data)
 
-@router.get("/", response_model=list[User])
-def read_all(session: Session = Depends(get_session), current_user: dict = Depends(require_role("admin"))):
-    return get_all_users(session)
+@router.get("/", response_model=list[User], responses={200: {"content": {NDJSON_MEDIA_TYPE: {}}}})
+async def read_all(
+    request: Request,
+    page: PageParams = Depends(),
+    created_from: Optional[datetime] = Query(None),
+    created_to: Optional[datetime] = Query(None),
+    session: AsyncSession = Depends(get_session),
+    current_user: dict = Depends(require_role("admin"))
+):
+    # Bulk export: every matching row from the cursor on, ignoring the page size
+    if wants_ndjson(request):
+        statement = keyset_statement(users_statement(created_from, created_to), User, page.cursor, page.order_by, page.descending)
+        return stream_ndjson(statement, User)
+    # Plain rows straight from the query, encoded without building and validating models
+    users, next_cursor = await get_user_rows_page_async(
+        session, page.limit, page.cursor, page.order_by, page.descending, created_from, created_to
+    )
+    return rows_response(users, next_cursor)
     
 @router.get("/wp", response_model=list[User])
-def read_all_wp(skip: int, limit: int, session: Session = Depends(get_session), current_user: dict = Depends(require_role("admin"))):
-    return get_all_users_wp(session, skip, limit)
+async def read_all_wp(
+    skip: Optional[int] = Query(None, ge=0, deprecated=True, description="Offset paging, slower on deep pages. Use cursor instead"),
+    page: PageParams = Depends(),
+    session: AsyncSession = Depends(get_session),
+    current_user: dict = Depends(require_role("admin"))
+):
+    if skip is not None:
+        return await get_all_users_wp_async(session, skip, page.limit)
+    users, next_cursor = await get_user_rows_page_async(session, page.limit, page.cursor, page.order_by, page.descending)
+    return rows_response(users, next_cursor)
 
 @router.get("/{user_id}", response_model=UserRead)
-def read_by_id(user_id: int, session: Session = Depends(get_session)):
-    user = get_user_by_id(session, user_id)
+async def read_by_id(user_id: int, request: Request, response: Response, session: AsyncSession = Depends(get_session)):
+    # The row version is enough to answer a revalidation, the user is only loaded when it changed
+    version = await get_user_version_async(session, user_id)
+    if version is None:
+        raise HTTPException(status_code=404, detail=f"User with ID {user_id} not found")
+    unchanged = conditional_response(request, response, make_etag(f"user-{user_id}-{version}"), USER_CACHE_HEADERS)
+    if unchanged:
+        return unchanged
+    user = await get_user_by_id_async(session, user_id)
     if not user:
         raise HTTPException(status_code=404, detail=f"User with ID {user_id} not found")
     return user
 
 @router.get("/name/{name}", response_model=UserRead)
-def read_by_name(name: str, session: Session = Depends(get_session)):
-    user = get_user_by_name(session, name)
+async def read_by_name(name: str, session: AsyncSession = Depends(get_session)):
+    user = await get_user_by_name_async(session, name)
     if not user:
         raise HTTPException(status_code=404, detail=f"User with name '{name}' not found")
     return user
     
 @router.get("/email/{email}", response_model=UserRead)
-def read_by_email(email: str, session: Session = Depends(get_session)):
-    user = get_user_by_mail(session, email)
+async def read_by_email(email: str, session: AsyncSession = Depends(get_session)):
+    user = await get_user_by_mail_async(session, email)
     if not user:
         raise HTTPException(status_code=404, detail=f"User with email '{email}' not found")
     return user
 
 @router.put("/{user_id}", response_model=User)
-def update_by_id(
+async def update_by_id(
     user_id: int,
     user_data: dict = Body(
         ...,
@@ -67,16 +105,16 @@ def update_by_id(
             "email": "updated_email@example.com"
         }]
     ),
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_session),
     current_user: dict = Depends(require_role("admin"))
 ):
-    updated_user = update_user_by_id(session, user_id, user_data)
+    updated_user = await update_user_by_id_async(session, user_id, user_data)
     if not updated_user:
         raise HTTPException(status_code=404, detail=f"User with ID {user_id} not found")
     return updated_user
 
 @router.put("/name/{name}", response_model=User)
-def update_by_name(
+async def update_by_name(
     name: str,
     user_data: dict = Body(
         ...,
@@ -85,26 +123,26 @@ def update_by_name(
             "email": "updated_email@example.com"
         }]
     ),
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_session),
     current_user: dict = Depends(require_role("admin"))
 ):
-    updated_user = update_user_by_name(session, name, user_data)
+    updated_user = await update_user_by_name_async(session, name, user_data)
     if not updated_user:
         raise HTTPException(status_code=404, detail=f"User with name '{name}' not found")
     return updated_user
 
 @router.delete("/{user_id}", response_model=User)
-def delete_by_id(user_id: int, session: Session = Depends(get_session), current_user: dict = Depends(get_current_user)):
+async def delete_by_id(user_id: int, session: AsyncSession = Depends(get_session), current_user: dict = Depends(get_current_user)):
     require_ownership_or_admin(user_id, current_user)
-    deleted_user = delete_user_by_id(session, user_id)
+    deleted_user = await delete_user_by_id_async(session, user_id)
     if not deleted_user:
         raise HTTPException(status_code=404, detail=f"User with ID {user_id} not found")
     return deleted_user
 
 @router.delete("/name/{name}", response_model=User)
-def delete_by_name(name: str, session: Session = Depends(get_session), current_user: dict = Depends(get_current_user)):
+async def delete_by_name(name: str, session: AsyncSession = Depends(get_session), current_user: dict = Depends(get_current_user)):
     require_ownership_or_admin(name, current_user)
-    deleted_user = delete_user_by_name(session, name)
+    deleted_user = await delete_user_by_name_async(session, name)
     if not deleted_user:
         raise HTTPException(status_code=404, detail=f"User with name '{name}' not found")
     return deleted_user
\ No newline at end of file
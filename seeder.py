@@ -1,23 +1,37 @@
-from datetime import datetime
+from datetime import datetime, time as day_start, timedelta
+from sqlalchemy import text
 from sqlmodel import Session
 from db.database import engine, create_db_and_tables, drop_db_and_tables
 from models.user import User
 from models.order import Order
 from models.status import Status
-from auth.hashing import hash_password
+from auth.hashing import hash_password, hash_passwords, hashing_pool
+from crud.order import order_totals
+from benchmarks.fake_catalog import generate_products
 import argparse
+import csv
+import io
+import json
+import random
+import time
+from alembic import command
+from alembic.config import Config
 
 def seed_data(num_dummies=5):
     with Session(engine) as session:
         try:
+            # bcrypt is slow on purpose, hash every password in parallel through the hashing pool
+            hashes = hash_passwords([f"password{i}" for i in range(num_dummies)] + [f"admin{num_dummies}"])
             users = []
             for i in range(num_dummies):
-                users.append(User(username=f"User {i}", email=f"user{i}@example.com", role="client", hashed_password=hash_password(f"password{i}"), created_at=datetime.now()))
-            users.append(User(username=f"User {num_dummies}", email=f"admin{num_dummies}@example.com", role="admin", hashed_password=hash_password(f"admin{num_dummies}"), created_at=datetime.now()))
+                users.append(User(username=f"User {i}", email=f"user{i}@example.com", role="client", hashed_password=hashes[i], created_at=datetime.now()))
+            users.append(User(username=f"User {num_dummies}", email=f"admin{num_dummies}@example.com", role="admin", hashed_password=hashes[num_dummies], created_at=datetime.now()))
             session.add_all(users)
             session.commit()
         except Exception as e:
             print(f"Error creating users: {e}")
+        finally:
+            hashing_pool.shutdown()
 
         try:
             status1 = Status(name=f"Order Created", color=f"Yellow")
@@ -41,19 +55,140 @@ def seed_data(num_dummies=5):
         
     print("Tables seeded successfully!")
 
+def reset_schema():
+    drop_db_and_tables()
+    create_db_and_tables()
+    # The fresh tables match the latest migration, record that so `alembic upgrade head` starts from here
+    command.stamp(Config("alembic.ini"), "head", purge=True)
+
+# Bulk mode: load-testing volumes, loaded with COPY in batches instead of through the ORM
+
+BULK_PASSWORD = "password"
+# Share of orders in each status, by name; statuses not listed get weight 1
+STATUS_WEIGHTS = {"Order Created": 15, "Order Placed": 20, "Payment Complete": 20, "Delivered": 40, "RMA": 5}
+# Lines per cart and units per line, most carts are small
+CART_LINES = (range(0, 11), [5, 20, 20, 15, 12, 9, 7, 5, 4, 2, 1])
+LINE_QUANTITY = (range(1, 6), [60, 20, 10, 6, 4])
+
+def _copy(table: str, columns: list[str], rows: list[tuple]):
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(rows)
+    buffer.seek(0)
+    connection = engine.raw_connection()
+    try:
+        with connection.cursor() as cursor:
+            cursor.copy_expert(f'COPY "{table}" ({", ".join(columns)}) FROM STDIN WITH (FORMAT csv)', buffer)
+        connection.commit()
+    finally:
+        connection.close()
+
+def _scalar(sql: str):
+    with engine.connect() as connection:
+        return connection.execute(text(sql)).scalar()
+
+def _created_at(rng: random.Random, end: datetime, days: int) -> datetime:
+    # Squaring skews the spread towards recent dates, like a growing shop
+    return end - timedelta(seconds=int(days * 86400 * rng.random() ** 2))
+
+def _cart(rng: random.Random, catalog: list[dict]) -> list[dict]:
+    lines = {}
+    for _ in range(rng.choices(*CART_LINES)[0]):
+        p = rng.choice(catalog)
+        line = lines.setdefault(p["id"], {"id": p["id"], "title": p["title"], "quantity": 0, "price": p["price"]})
+        line["quantity"] += rng.choices(*LINE_QUANTITY)[0]
+    return list(lines.values())
+
+def bulk_seed(users: int, orders: int, seed: int = 42, batch_size: int = 50000, days: int = 365, products: int = 100, unique_passwords: bool = False, end: datetime | None = None):
+    """Add `users` users and `orders` orders with realistic carts, statuses and dates.
+
+    Only appends, so it runs on top of seed_data() or an earlier bulk_seed().
+    The same seed and end date produce the same rows. Bulk users are named
+    `bulk_user_<n>`, their password is "password" (one hash shared by all
+    unless unique_passwords, then "password<n>" hashed in parallel).
+    Carts use the products of benchmarks.fake_catalog with the same catalog
+    size, so they match what the fake catalog serves.
+    """
+    rng = random.Random(seed)
+    end = end or datetime.combine(datetime.now().date(), day_start())
+    catalog = generate_products(products)
+    started = time.perf_counter()
+
+    with engine.connect() as connection:
+        statuses = dict(connection.execute(text("SELECT id, name FROM status ORDER BY id")).all())
+    if not statuses:
+        raise RuntimeError("No statuses found, seed the base data first")
+    status_ids, status_weights = list(statuses), [STATUS_WEIGHTS.get(name, 1) for name in statuses.values()]
+
+    # Numbered after the existing users, so appending never collides
+    first = _scalar('SELECT coalesce(max(id), 0) FROM "user"') + 1
+    shared_hash = None if unique_passwords else hash_password(BULK_PASSWORD)
+    for start in range(first, first + users, batch_size):
+        numbers = range(start, min(start + batch_size, first + users))
+        hashes = hash_passwords([f"{BULK_PASSWORD}{n}" for n in numbers]) if unique_passwords else [shared_hash] * len(numbers)
+        _copy("user", ["username", "email", "role", "hashed_password", "created_at"], [
+            (f"bulk_user_{n}", f"bulk_user_{n}@example.com", "client", hashed, _created_at(rng, end, days).isoformat())
+            for n, hashed in zip(numbers, hashes)
+        ])
+        print(f"Users: {numbers[-1] - first + 1}/{users}")
+    if unique_passwords:
+        hashing_pool.shutdown()
+
+    # Orders go to bulk and existing users alike. Ids can have gaps (deleted users, sequence jumps), so
+    # owners are drawn from the real ids, in id order to keep the draw reproducible
+    with engine.connect() as connection:
+        user_ids = connection.execute(text('SELECT id FROM "user" ORDER BY id')).scalars().all()
+    if orders and not user_ids:
+        raise RuntimeError("No users to own the orders")
+    for start in range(0, orders, batch_size):
+        rows = []
+        for _ in range(min(batch_size, orders - start)):
+            cart = _cart(rng, catalog)
+            item_count, total = order_totals(cart)
+            rows.append((
+                _created_at(rng, end, days).isoformat(),
+                json.dumps(cart, separators=(",", ":")),
+                rng.choices(status_ids, status_weights)[0],
+                rng.choice(user_ids),
+                item_count,
+                total,
+            ))
+        _copy("order", ["created_at", "products", "status_id", "user_id", "item_count", "total"], rows)
+        print(f"Orders: {start + len(rows)}/{orders}")
+
+    # Fresh statistics, otherwise the planner keeps costing the tables as tiny
+    with engine.begin() as connection:
+        connection.execute(text('ANALYZE "user"'))
+        connection.execute(text('ANALYZE "order"'))
+    print(f"Bulk seeded {users} users and {orders} orders in {time.perf_counter() - started:.1f}s")
+
 if __name__ == "__main__":
     parser = argparse.ArgumentParser()
     parser.add_argument('--bypass-warning', action='store_true', help='Bypass warning.')
+    parser.add_argument('--bulk-users', type=int, default=0, help='Extra users to bulk load after the base data.')
+    parser.add_argument('--bulk-orders', type=int, default=0, help='Orders with products to bulk load after the base data.')
+    parser.add_argument('--append', action='store_true', help='Only bulk load, keeping the existing tables and rows.')
+    parser.add_argument('--seed', type=int, default=42, help='Random seed, the same seed loads the same rows.')
+    parser.add_argument('--batch-size', type=int, default=50000, help='Rows per COPY.')
+    parser.add_argument('--days', type=int, default=365, help='created_at spread, in days back from today.')
+    parser.add_argument('--products', type=int, default=100, help='Size of the fake catalog carts are drawn from.')
+    parser.add_argument('--unique-passwords', action='store_true', help='Hash a different password per bulk user (slow).')
     args = parser.parse_args()
-    
+
+    def bulk():
+        if args.bulk_users or args.bulk_orders:
+            bulk_seed(args.bulk_users, args.bulk_orders, args.seed, args.batch_size, args.days, args.products, args.unique_passwords)
+
+    if args.append:
+        bulk()
+        exit(0)
     if args.bypass_warning:
-        drop_db_and_tables() 
-        create_db_and_tables()
+        reset_schema()
         seed_data()
+        bulk()
         exit(0)
     acknowledge = input("WARNING: All database tables are about to be dropped, continue? (y/N)") == 'y'
     if acknowledge:
-        drop_db_and_tables() 
-        create_db_and_tables()
+        reset_schema()
         seed_data()
+        bulk()
             
@@ -0,0 +1,33 @@
+import json
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+from crud.order import order_totals, order_totals_sql
+from db.database import engine
+
+# Carts the Python and SQL totals must agree on, including lines with missing or null fields
+CARTS = [
+    [],
+    [{"id": 1, "title": "a", "quantity": 2, "price": 9.99}],
+    [{"id": 1, "title": "a", "quantity": 3, "price": 0.125}, {"id": 2, "title": "b", "quantity": 1, "price": 10}],
+    [{"id": 1, "title": "a", "quantity": 2, "price": None}, {"id": 2, "title": "b", "quantity": 1, "price": 4.5}],
+    [{"id": 1, "title": "a", "quantity": 2}, {"id": 2, "title": "b", "price": 4.5}],
+    [{"id": 1, "title": "a", "quantity": None, "price": 3}],
+]
+
+@pytest.fixture(scope="module")
+def connection():
+    try:
+        with engine.connect() as connection:
+            yield connection
+    except OperationalError:
+        pytest.skip("PostgreSQL is not reachable")
+
+@pytest.mark.parametrize("cart", CARTS)
+def test_order_totals_match_sql(connection, cart):
+    statement = text(order_totals_sql("CAST(:lines AS jsonb)"))
+    item_count, total = connection.execute(statement, {"lines": json.dumps(cart)}).one()
+    assert order_totals(cart) == (item_count, total)
+
+def test_order_totals_null_price_counts_as_zero():
+    assert order_totals([{"quantity": 2, "price": None}, {"quantity": 1, "price": 1.5}]) == (3, 1.5)
@@ -1,17 +1,177 @@
+import asyncio
+import hashlib
+import os
+import time
+from typing import Optional
 import httpx
+from log.logger import logger
+from utils.catalog_index import CatalogIndex
+from utils.metrics import catalog_download_duration, catalog_fetch_duration
 
-async def fetch_product_data():
-    url = f"https://dummyjson.com/products"
-    
+PRODUCTS_API_URL = os.getenv("PRODUCTS_API_URL", "https://dummyjson.com/products")
+PRODUCTS_API_TIMEOUT = float(os.getenv("PRODUCTS_API_TIMEOUT", "10"))
+PRODUCTS_API_MAX_CONNECTIONS = int(os.getenv("PRODUCTS_API_MAX_CONNECTIONS", "20"))
+# Seconds a catalog is served as fresh, and extra seconds it may be served stale while it is refreshed
+CATALOG_CACHE_TTL = float(os.getenv("CATALOG_CACHE_TTL", "300"))
+CATALOG_CACHE_STALE_TTL = float(os.getenv("CATALOG_CACHE_STALE_TTL", "3600"))
+
+_client: Optional[httpx.AsyncClient] = None
+
+def _build_client() -> httpx.AsyncClient:
+    limits = httpx.Limits(
+        max_connections=PRODUCTS_API_MAX_CONNECTIONS,
+        max_keepalive_connections=PRODUCTS_API_MAX_CONNECTIONS,
+    )
+    return httpx.AsyncClient(verify=False, timeout=PRODUCTS_API_TIMEOUT, limits=limits)
+
+async def start_client():
+    """Create the shared, pooled HTTP client. Called once at app startup."""
+    global _client
+    if _client is None or _client.is_closed:
+        _client = _build_client()
+    return _client
+
+async def close_client():
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+def get_client() -> httpx.AsyncClient:
+    # Scripts that never ran the app lifespan still get a working client
+    global _client
+    if _client is None or _client.is_closed:
+        _client = _build_client()
+    return _client
+
+async def _download_catalog() -> tuple[dict, str]:
+    """The catalog and a hash of its content, which serves as its version."""
+    start = time.perf_counter()
+    outcome = "error"
     try:
-        async with httpx.AsyncClient(verify=False) as client:
-            response = await client.get(url, timeout=10.0)
-            response.raise_for_status()
-            data = response.json()
-            return data
+        response = await get_client().get(PRODUCTS_API_URL)
+        response.raise_for_status()
+        data = response.json()
+        outcome = "ok"
+        return data, hashlib.sha1(response.content).hexdigest()[:16]
     except httpx.RequestError as e:
         raise Exception(f"Error de conexión al consultar la API externa: {str(e)}")
     except httpx.HTTPStatusError as e:
         raise Exception(f"Respuesta inválida de la API externa: {e.response.status_code}")
     except Exception as e:
-        raise Exception(f"Ocurrió un error inesperado: {str(e)}")
\ No newline at end of file
+        raise Exception(f"Ocurrió un error inesperado: {str(e)}")
+    finally:
+        catalog_download_duration.observe(time.perf_counter() - start, outcome)
+
+class CatalogCache:
+    """In-process TTL cache of the external catalog with stale-while-revalidate.
+
+    Concurrent misses share a single upstream request (single-flight), and a
+    stale entry is returned immediately while one background refresh runs.
+    Each refresh also rebuilds the CatalogIndex used for product searches.
+    """
+
+    def __init__(self, ttl: float = CATALOG_CACHE_TTL, stale_ttl: float = CATALOG_CACHE_STALE_TTL):
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self._data: Optional[dict] = None
+        self._index: Optional[CatalogIndex] = None
+        # Content hash of the cached catalog, the same in every worker holding the same catalog
+        self.version: Optional[str] = None
+        self._fetched_at = 0.0
+        self._inflight: Optional[asyncio.Task] = None
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.refreshes = 0
+        self.errors = 0
+        self.coalesced = 0
+
+    def _age(self) -> float:
+        return time.monotonic() - self._fetched_at
+
+    async def _refresh(self):
+        self.refreshes += 1
+        try:
+            data, version = await _download_catalog()
+        except Exception:
+            self.errors += 1
+            raise
+        # Indexing a large catalog takes a while, keep it off the event loop
+        index = await asyncio.to_thread(CatalogIndex, data.get("products") or [])
+        self._data, self._index, self.version = data, index, version
+        self._fetched_at = time.monotonic()
+        return data
+
+    def _start_refresh(self) -> asyncio.Task:
+        if self._inflight is None or self._inflight.done():
+            self._inflight = asyncio.create_task(self._refresh())
+            self._inflight.add_done_callback(self._on_refresh_done)
+        else:
+            self.coalesced += 1
+        return self._inflight
+
+    def _on_refresh_done(self, task: asyncio.Task):
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning(f"Catalog refresh failed: {task.exception()}")
+
+    async def _lookup(self) -> tuple[dict, str]:
+        if self._data is not None:
+            age = self._age()
+            if age < self.ttl:
+                self.hits += 1
+                return self._data, "hit"
+            if age < self.ttl + self.stale_ttl:
+                self.stale_hits += 1
+                self._start_refresh()
+                return self._data, "stale"
+        self.misses += 1
+        # Shield so a cancelled caller does not cancel the fetch other callers are waiting on
+        return await asyncio.shield(self._start_refresh()), "miss"
+
+    async def get(self) -> dict:
+        start = time.perf_counter()
+        outcome = "error"
+        try:
+            data, outcome = await self._lookup()
+            return data
+        finally:
+            catalog_fetch_duration.observe(time.perf_counter() - start, outcome)
+
+    async def get_index(self) -> CatalogIndex:
+        await self.get()
+        return self._index
+
+    def invalidate(self):
+        self._data = None
+        self._index = None
+        self.version = None
+        self._fetched_at = 0.0
+
+    def stats(self) -> dict:
+        return {
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "refreshes": self.refreshes,
+            "errors": self.errors,
+            "coalesced": self.coalesced,
+            "cached": self._data is not None,
+            "products": len(self._index) if self._index is not None else 0,
+            "version": self.version,
+            "age_seconds": round(self._age(), 3) if self._data is not None else None,
+            "ttl_seconds": self.ttl,
+            "stale_ttl_seconds": self.stale_ttl,
+        }
+
+catalog_cache = CatalogCache()
+
+async def fetch_product_data():
+    return await catalog_cache.get()
+
+async def get_catalog_index() -> CatalogIndex:
+    return await catalog_cache.get_index()
+
+def get_catalog_version() -> Optional[str]:
+    """Version of the catalog last returned by get_catalog_index."""
+    return catalog_cache.version
@@ -0,0 +1,177 @@
+from bisect import bisect_left, bisect_right
+from typing import Optional
+
+# Numeric fields with a precomputed sort order, so sorted pages are read without sorting
+SORTED_FIELDS = ("price", "rating")
+
+def _trigrams(text: str) -> set[str]:
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+class CatalogIndex:
+    """Read-only index over the external product catalog.
+
+    Built once per catalog refresh. Filters are answered from hash and
+    inverted indexes (id, category, brand, tag, title trigrams) and a
+    price-sorted array, intersecting the smallest candidate set first.
+    Products are addressed by their position in the upstream list so
+    unsorted results keep the upstream order.
+    """
+
+    def __init__(self, products: list[dict]):
+        self.products = products
+        self.by_id: dict[int, int] = {}
+        self._title: list[str] = []
+        self._price: list[Optional[float]] = []
+        self._by_category: dict[str, set[int]] = {}
+        self._by_brand: dict[str, set[int]] = {}
+        self._by_tag: dict[str, set[int]] = {}
+        self._by_trigram: dict[str, set[int]] = {}
+
+        for pos, p in enumerate(products):
+            if p.get("id") is not None:
+                self.by_id.setdefault(p["id"], pos)
+            title = str(p.get("title") or "").lower()
+            category = str(p.get("category") or "").lower()
+            brand = str(p.get("brand") or "").lower()
+            tags = frozenset(str(t).lower() for t in p.get("tags") or [])
+            price = p.get("price")
+            self._title.append(title)
+            self._price.append(price if isinstance(price, (int, float)) else None)
+            self._by_category.setdefault(category, set()).add(pos)
+            self._by_brand.setdefault(brand, set()).add(pos)
+            for tag in tags:
+                self._by_tag.setdefault(tag, set()).add(pos)
+            for gram in _trigrams(title):
+                self._by_trigram.setdefault(gram, set()).add(pos)
+
+        priced = sorted((price, pos) for pos, price in enumerate(self._price) if price is not None)
+        self._price_keys = [price for price, _ in priced]
+        self._price_positions = [pos for _, pos in priced]
+
+        self._sort_orders: dict[tuple[str, bool], list[int]] = {}
+        for field in SORTED_FIELDS:
+            for reverse in (False, True):
+                try:
+                    self._sort_orders[(field, reverse)] = sorted(
+                        range(len(products)), key=lambda pos: products[pos].get(field, 0), reverse=reverse
+                    )
+                except TypeError:
+                    pass
+
+    def __len__(self):
+        return len(self.products)
+
+    def get(self, product_id: int) -> Optional[dict]:
+        pos = self.by_id.get(product_id)
+        return self.products[pos] if pos is not None else None
+
+    def _price_range(self, min_price: Optional[float], max_price: Optional[float]) -> tuple[int, int]:
+        lo = bisect_left(self._price_keys, min_price) if min_price is not None else 0
+        hi = bisect_right(self._price_keys, max_price) if max_price is not None else len(self._price_keys)
+        return lo, max(lo, hi)
+
+    def _title_postings(self, title: str) -> Optional[list[set[int]]]:
+        grams = _trigrams(title)
+        if not grams:
+            return None
+        return [self._by_trigram.get(gram, set()) for gram in grams]
+
+    def search(
+        self,
+        *,
+        id: Optional[int] = None,
+        title: Optional[str] = None,
+        category: Optional[str] = None,
+        tag: Optional[str] = None,
+        brand: Optional[str] = None,
+        min_price: Optional[float] = None,
+        max_price: Optional[float] = None,
+        sort_by: Optional[str] = None,
+        sort_order: Optional[str] = None,
+        skip: Optional[int] = None,
+        limit: Optional[int] = None,
+    ) -> list[dict]:
+        """Filter, then sort, then paginate. Raises TypeError if `sort_by` is not comparable."""
+        title = title.lower() if title else None
+
+        # Each source is (size, materialize as the first candidate set, narrow an existing one)
+        sources = []
+        if id is not None:
+            pos = self.by_id.get(id)
+            if pos is None:
+                return []
+            sources.append((1, lambda: {pos}, lambda candidates: candidates & {pos}))
+        for value, inverted in ((category, self._by_category), (brand, self._by_brand), (tag, self._by_tag)):
+            if value:
+                matches = inverted.get(value.lower())
+                if not matches:
+                    return []
+                sources.append((len(matches), matches.copy, matches.intersection))
+        if min_price is not None or max_price is not None:
+            lo, hi = self._price_range(min_price, max_price)
+            if lo == hi:
+                return []
+            low, high = self._price_keys[lo], self._price_keys[hi - 1]
+            prices = self._price
+            sources.append((
+                hi - lo,
+                lambda: set(self._price_positions[lo:hi]),
+                lambda candidates: {pos for pos in candidates if prices[pos] is not None and low <= prices[pos] <= high},
+            ))
+        if title:
+            postings = self._title_postings(title)
+            if postings is not None:
+                postings.sort(key=len)
+                if not postings[0]:
+                    return []
+                sources.append((
+                    len(postings[0]),
+                    lambda: postings[0].intersection(*postings[1:]),
+                    lambda candidates: candidates.intersection(*postings),
+                ))
+
+        if sources:
+            # Smallest first, so every later step only touches the surviving candidates
+            sources.sort(key=lambda source: source[0])
+            candidates = sources[0][1]()
+            for _, _, narrow in sources[1:]:
+                if not candidates:
+                    return []
+                candidates = narrow(candidates)
+        else:
+            candidates = None
+        # Trigrams only narrow the search, and titles under three characters have none
+        if title:
+            scan = candidates if candidates is not None else range(len(self.products))
+            candidates = {pos for pos in scan if title in self._title[pos]}
+
+        start = skip or 0
+        end = start + limit if limit is not None else None
+        positions = self._ordered(candidates, sort_by, sort_order == "desc", end)
+        return [self.products[pos] for pos in positions[start:end]]
+
+    def _ordered(self, candidates: Optional[set[int]], sort_by: Optional[str], reverse: bool, end: Optional[int]) -> list[int]:
+        total = len(self.products)
+        if not sort_by:
+            if candidates is None:
+                return range(total) if end is None else range(min(end, total))
+            return sorted(candidates)
+
+        order = self._sort_orders.get((sort_by, reverse))
+        # Walking a precomputed order beats sorting once the candidates are a large share of the catalog
+        if order is not None and (candidates is None or len(candidates) * 8 > total):
+            if candidates is None:
+                return order if end is None else order[:end]
+            result = []
+            for pos in order:
+                if pos in candidates:
+                    result.append(pos)
+                    if end is not None and len(result) >= end:
+                        break
+            return result
+
+        if candidates is None:
+            candidates = range(total)
+        products = self.products
+        # Pre-sort by position so ties keep the upstream order, as a plain stable sort would
+        return sorted(sorted(candidates), key=lambda pos: products[pos].get(sort_by, 0), reverse=reverse)
@@ -0,0 +1,41 @@
+import os
+from typing import Optional
+from fastapi import Request, Response
+
+# Seconds clients may reuse a response before revalidating it with its ETag:
+# long for data that rarely changes (statuses, the catalog), short for orders
+STATUS_HTTP_MAX_AGE = int(os.getenv("STATUS_HTTP_MAX_AGE", "300"))
+PRODUCTS_HTTP_MAX_AGE = int(os.getenv("PRODUCTS_HTTP_MAX_AGE", "300"))
+USER_HTTP_MAX_AGE = int(os.getenv("USER_HTTP_MAX_AGE", "30"))
+ORDER_HTTP_MAX_AGE = int(os.getenv("ORDER_HTTP_MAX_AGE", "5"))
+
+def make_etag(value: str) -> str:
+    return f'"{value}"'
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """True when the request's If-None-Match already names `etag`."""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    # If-None-Match uses weak comparison, so W/"x" matches "x"
+    candidates = {tag.strip().removeprefix("W/") for tag in header.split(",")}
+    return etag in candidates
+
+def not_modified(etag: str, headers: dict | None = None) -> Response:
+    return Response(status_code=304, headers={"ETag": etag, **(headers or {})})
+
+def cache_control(max_age: int, private: bool = False) -> dict:
+    return {"Cache-Control": f"{'private' if private else 'public'}, max-age={max_age}"}
+
+def conditional_response(request: Request, response: Response, etag: str, headers: dict) -> Optional[Response]:
+    """A 304 when the client already holds `etag`.
+
+    Otherwise returns None after adding the ETag and `headers` to the
+    response the route is about to send.
+    """
+    if etag_matches(request, etag):
+        return not_modified(etag, headers)
+    response.headers.update({"ETag": etag, **headers})
+    return None
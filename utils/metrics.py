@@ -0,0 +1,193 @@
+import os
+import threading
+from bisect import bisect_left
+from typing import Callable, Iterable
+
+# Upper bounds in seconds, shared by every latency histogram so they can be compared and aggregated
+METRICS_BUCKETS = tuple(
+    float(bound) for bound in os.getenv(
+        "METRICS_BUCKETS", "0.001,0.0025,0.005,0.01,0.025,0.05,0.1,0.25,0.5,1,2.5,5,10"
+    ).split(",")
+)
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _labels(names: tuple, values: tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _number(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _header(self) -> list[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: Iterable[str] = ()):
+        super().__init__(name, help, labelnames)
+        self._values: dict[tuple, float] = {}
+
+    def inc(self, *labels, amount: float = 1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self) -> list[str]:
+        with self._lock:
+            values = list(self._values.items())
+        return self._header() + [f"{self.name}{_labels(self.labelnames, labels)} {_number(value)}" for labels, value in values]
+
+class Gauge(_Metric):
+    """Gauge set directly, or read from `collect` at scrape time.
+
+    `collect` returns {label values tuple: value}, so stats kept elsewhere are
+    exported without being copied on every change.
+    """
+
+    kind = "gauge"
+
+    def __init__(self, name: str, help: str, labelnames: Iterable[str] = (), collect: Callable[[], dict] | None = None):
+        super().__init__(name, help, labelnames)
+        self._values: dict[tuple, float] = {}
+        self.collect = collect
+
+    def inc(self, *labels, amount: float = 1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def dec(self, *labels, amount: float = 1):
+        self.inc(*labels, amount=-amount)
+
+    def set(self, value: float, *labels):
+        with self._lock:
+            self._values[labels] = value
+
+    def render(self) -> list[str]:
+        if self.collect is not None:
+            values = list(self.collect().items())
+        else:
+            with self._lock:
+                values = list(self._values.items())
+        return self._header() + [f"{self.name}{_labels(self.labelnames, labels)} {_number(value)}" for labels, value in values]
+
+class Histogram(_Metric):
+    """Cumulative latency histogram per label set, observed in seconds."""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: Iterable[str] = (), buckets: tuple = METRICS_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # label values -> [count per bucket (the last one is +Inf), sum]
+        self._series: dict[tuple, list] = {}
+
+    def observe(self, value: float, *labels):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def render(self) -> list[str]:
+        with self._lock:
+            series = [(labels, list(counts), total) for labels, (counts, total) in self._series.items()]
+        lines = self._header()
+        for labels, counts, total in series:
+            cumulative = 0
+            for bound, count in zip((*self.buckets, "+Inf"), counts):
+                cumulative += count
+                le = 'le="{}"'.format(bound if bound == "+Inf" else _number(bound))
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, labels)} {_number(total)}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, labels)} {cumulative}")
+        return lines
+
+class MetricsRegistry:
+    """Metrics of this worker process, rendered in the Prometheus text format."""
+
+    def __init__(self):
+        self._metrics: dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> _Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help: str, labelnames: Iterable[str] = ()) -> Counter:
+        return self.register(Counter(name, help, labelnames))
+
+    def gauge(self, name: str, help: str, labelnames: Iterable[str] = (), collect: Callable[[], dict] | None = None) -> Gauge:
+        return self.register(Gauge(name, help, labelnames, collect))
+
+    def histogram(self, name: str, help: str, labelnames: Iterable[str] = (), buckets: tuple = METRICS_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, help, labelnames, buckets))
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+registry = MetricsRegistry()
+
+# Recorded where the work happens: requests in log.middleware, queries in db.pool, Redis calls in
+# auth.redis_client.timed, the catalog in utils.api_client, reports in routes.reporting and utils.pdf_renderer
+http_request_duration = registry.histogram(
+    "http_request_duration_seconds", "Request latency by route template and status.", ("method", "route", "status")
+)
+http_requests_in_flight = registry.gauge("http_requests_in_flight", "Requests currently being served.")
+db_query_duration = registry.histogram(
+    "db_query_duration_seconds", "SQL statement latency by engine and statement type.", ("engine", "statement")
+)
+db_query_errors = registry.counter("db_query_errors_total", "SQL statements that raised.", ("engine", "statement"))
+redis_command_duration = registry.histogram(
+    "redis_command_duration_seconds", "Redis call latency by operation.", ("operation", "outcome")
+)
+catalog_fetch_duration = registry.histogram(
+    "catalog_fetch_duration_seconds", "Catalog lookups (fetch_product_data, product search) by cache outcome.", ("outcome",)
+)
+catalog_download_duration = registry.histogram(
+    "catalog_download_duration_seconds", "Latency of catalog downloads from the external API.", ("outcome",)
+)
+report_build_duration = registry.histogram(
+    "report_build_duration_seconds", "Time to build a report on a cache miss, by format.", ("format",)
+)
+pdf_render_duration = registry.histogram(
+    "pdf_render_duration_seconds", "PDF render time in the worker and end to end including the queue.", ("stage",)
+)
+
+def statement_type(statement: str) -> str:
+    """First SQL keyword (SELECT, INSERT...), a bounded label for query metrics."""
+    head = statement.lstrip()[:16].split(None, 1)
+    return head[0].upper() if head else "UNKNOWN"
+
+def _threadpool_tokens() -> dict:
+    # anyio's default limiter bounds run_in_threadpool and sync endpoints; only readable inside the event loop
+    try:
+        from anyio.to_thread import current_default_thread_limiter
+        limiter = current_default_thread_limiter()
+    except RuntimeError:
+        return {}
+    return {("borrowed",): limiter.borrowed_tokens, ("total",): limiter.total_tokens}
+
+registry.gauge("threadpool_tokens", "anyio worker thread tokens in use and available in total.", ("state",), collect=_threadpool_tokens)
+
+def render_metrics() -> str:
+    return registry.render()
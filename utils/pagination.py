@@ -0,0 +1,116 @@
+import base64
+import json
+import os
+from datetime import datetime
+from typing import Any, Literal, Optional
+from fastapi import Query, Response
+from fastapi.responses import ORJSONResponse
+from sqlalchemy import tuple_
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+DEFAULT_PAGE_SIZE = int(os.getenv("DEFAULT_PAGE_SIZE", "50"))
+MAX_PAGE_SIZE = int(os.getenv("MAX_PAGE_SIZE", "500"))
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+class InvalidCursorError(ValueError):
+    pass
+
+def stored_datetime(value: Optional[datetime]) -> Optional[datetime]:
+    """`value` as the columns store it: naive, in the server's local time (see datetime.now() on insert).
+
+    Postgres refuses to compare a timezone-aware parameter with a
+    `timestamp without time zone` column, so aware filters are converted first.
+    """
+    if value is None or value.tzinfo is None:
+        return value
+    return value.astimezone().replace(tzinfo=None)
+
+def encode_cursor(order_by: str, descending: bool, values: list[Any]) -> str:
+    values = [v.isoformat() if isinstance(v, datetime) else v for v in values]
+    raw = json.dumps({"k": order_by, "d": descending, "v": values}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str, order_by: str, descending: bool) -> list[Any]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        payload = json.loads(raw)
+        values = payload["v"]
+        if payload["k"] != order_by or payload["d"] != descending:
+            raise InvalidCursorError("Cursor was issued for a different sort order")
+        if order_by == "created_at":
+            values[0] = stored_datetime(datetime.fromisoformat(values[0]))
+        return values
+    except InvalidCursorError:
+        raise
+    except (ValueError, KeyError, TypeError, IndexError):
+        raise InvalidCursorError("Invalid cursor")
+
+def keyset_statement(statement, model, cursor: Optional[str] = None, order_by: str = "id", descending: bool = False):
+    """Order `statement` by `order_by` (the primary key breaks ties) and seek past the cursor."""
+    columns = _key_columns(model, order_by)
+    key = columns[0] if len(columns) == 1 else tuple_(*columns)
+    if cursor:
+        values = decode_cursor(cursor, order_by, descending)
+        if len(values) != len(columns):
+            raise InvalidCursorError("Invalid cursor")
+        bound = values[0] if len(columns) == 1 else tuple_(*values)
+        statement = statement.where(key < bound if descending else key > bound)
+    return statement.order_by(*[column.desc() if descending else column.asc() for column in columns])
+
+def _key_columns(model, order_by: str) -> list:
+    return [model.id] if order_by == "id" else [getattr(model, order_by), model.id]
+
+async def keyset_page(
+    session: AsyncSession,
+    statement,
+    model,
+    limit: int,
+    cursor: Optional[str] = None,
+    order_by: str = "id",
+    descending: bool = False,
+) -> tuple[list, Optional[str]]:
+    """Run `statement` one page at a time, seeking past the cursor instead of using OFFSET.
+
+    Returns the rows and the cursor of the next page, or None on the last page.
+    """
+    statement = keyset_statement(statement, model, cursor, order_by, descending)
+    # One extra row tells whether there is a next page
+    rows = (await session.exec(statement.limit(limit + 1))).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        values = [getattr(last, column.key) for column in _key_columns(model, order_by)]
+        next_cursor = encode_cursor(order_by, descending, values)
+    return rows, next_cursor
+
+class PageParams:
+    """Query parameters shared by the paginated listings."""
+
+    def __init__(
+        self,
+        limit: int = Query(DEFAULT_PAGE_SIZE, gt=0, le=MAX_PAGE_SIZE),
+        cursor: Optional[str] = Query(None, description=f"Opaque token from the {NEXT_CURSOR_HEADER} header of the previous page"),
+        order_by: Literal["id", "created_at"] = Query("id"),
+        descending: bool = Query(False),
+    ):
+        self.limit = limit
+        self.cursor = cursor
+        self.order_by = order_by
+        self.descending = descending
+
+def set_next_cursor(response: Response, next_cursor: Optional[str]):
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+
+def rows_response(rows: list[dict], next_cursor: Optional[str] = None) -> ORJSONResponse:
+    """A page of rows that are already in the response shape, encoded as they are.
+
+    Returning a Response skips FastAPI's per-item response_model validation,
+    so only use it for rows read straight from the database. The
+    response_model stays on the route for the OpenAPI schema.
+    """
+    response = ORJSONResponse(rows)
+    set_next_cursor(response, next_cursor)
+    return response
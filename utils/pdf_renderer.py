@@ -0,0 +1,99 @@
+import os
+import time
+from pathlib import Path
+from typing import Optional
+from jinja2 import Template
+from log.logger import logger
+from utils.metrics import pdf_render_duration, registry
+from utils.process_pool import BoundedProcessPool
+
+PDF_TEMPLATE_PATH = os.getenv("PDF_TEMPLATE_PATH", "templates/pdf_template.html")
+# Empty or unset means one worker per CPU
+PDF_WORKERS = int(os.getenv("PDF_WORKERS") or os.cpu_count() or 1)
+# Renders queued or running before new requests get a 503
+PDF_MAX_PENDING = int(os.getenv("PDF_MAX_PENDING", "16"))
+PDF_RENDER_TIMEOUT = float(os.getenv("PDF_RENDER_TIMEOUT", "30"))
+
+pdf_pool = BoundedProcessPool("pdf", PDF_WORKERS, PDF_MAX_PENDING, timeout=PDF_RENDER_TIMEOUT)
+
+_template: Optional[Template] = None
+
+def load_template() -> Template:
+    """Read and compile the PDF template, once per process."""
+    global _template
+    if _template is None:
+        _template = Template(Path(PDF_TEMPLATE_PATH).read_text(encoding="utf-8"))
+    return _template
+
+def render_html(**context) -> str:
+    return load_template().render(**context)
+
+def html_to_pdf(html: str) -> tuple[Optional[bytes], float]:
+    """Convert HTML to PDF, runs inside a pool worker.
+
+    Returns the PDF (None if xhtml2pdf reported errors) and the render time in ms.
+    """
+    from io import BytesIO
+    from xhtml2pdf import pisa
+
+    start = time.perf_counter()
+    pdf_buffer = BytesIO()
+    pisa_status = pisa.CreatePDF(html, dest=pdf_buffer)
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    if pisa_status.err:
+        return None, elapsed_ms
+    return pdf_buffer.getvalue(), elapsed_ms
+
+class RenderStats:
+    """Timings of PDF renders, in the worker and end to end including the queue."""
+
+    def __init__(self):
+        self.renders = 0
+        self.failures = 0
+        self.render_total_ms = 0.0
+        self.render_max_ms = 0.0
+        self.wall_total_ms = 0.0
+        self.wall_max_ms = 0.0
+
+    def record(self, render_ms: float, wall_ms: float, ok: bool):
+        self.renders += 1
+        if not ok:
+            self.failures += 1
+        self.render_total_ms += render_ms
+        self.render_max_ms = max(self.render_max_ms, render_ms)
+        self.wall_total_ms += wall_ms
+        self.wall_max_ms = max(self.wall_max_ms, wall_ms)
+
+    def snapshot(self) -> dict:
+        count = self.renders or 1
+        return {
+            "renders": self.renders,
+            "failures": self.failures,
+            "render_avg_ms": round(self.render_total_ms / count, 3),
+            "render_max_ms": round(self.render_max_ms, 3),
+            "wall_avg_ms": round(self.wall_total_ms / count, 3),
+            "wall_max_ms": round(self.wall_max_ms, 3),
+        }
+
+render_stats = RenderStats()
+
+async def render_pdf(html: str) -> Optional[bytes]:
+    """Render HTML to PDF in the pool, never on the event loop.
+
+    Raises PoolSaturatedError when the pool is full and asyncio.TimeoutError
+    after PDF_RENDER_TIMEOUT seconds.
+    """
+    start = time.perf_counter()
+    content, render_ms = await pdf_pool.run(html_to_pdf, html)
+    wall_ms = (time.perf_counter() - start) * 1000
+    render_stats.record(render_ms, wall_ms, content is not None)
+    pdf_render_duration.observe(render_ms / 1000, "render")
+    pdf_render_duration.observe(wall_ms / 1000, "wall")
+    if content is None:
+        logger.error(f"PDF render failed after {render_ms:.1f}ms")
+    return content
+
+def pdf_stats() -> dict:
+    return {**pdf_pool.stats(), **render_stats.snapshot()}
+
+registry.gauge("pdf_pool_pending", "PDF renders queued or running.", collect=lambda: {(): pdf_pool.pending})
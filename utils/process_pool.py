@@ -0,0 +1,98 @@
+import asyncio
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Iterable, Optional
+
+# spawn keeps workers free of the parent's threads, sockets and event loop
+PROCESS_POOL_START_METHOD = os.getenv("PROCESS_POOL_START_METHOD", "spawn")
+
+class PoolSaturatedError(Exception):
+    """Raised when a pool already has `max_pending` jobs queued or running."""
+
+    def __init__(self, pool_name: str):
+        super().__init__(f"The {pool_name} pool is saturated, try again later")
+        self.pool_name = pool_name
+
+class BoundedProcessPool:
+    """ProcessPoolExecutor with a cap on queued work and an optional timeout.
+
+    Jobs beyond `max_pending` are rejected with PoolSaturatedError instead of
+    queueing, so latency stays bounded under overload. The executor is created
+    on first use or by `start()`.
+    """
+
+    def __init__(self, name: str, max_workers: int, max_pending: int, timeout: Optional[float] = None):
+        self.name = name
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self.pending = 0
+        self.completed = 0
+        self.rejected = 0
+        self.timeouts = 0
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context(PROCESS_POOL_START_METHOD),
+            )
+        return self._executor
+
+    def start(self):
+        self._get_executor()
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+
+    def _release(self):
+        self.pending -= 1
+
+    def _release_from_worker(self, loop: asyncio.AbstractEventLoop):
+        # Done callbacks run in the executor's thread
+        try:
+            loop.call_soon_threadsafe(self._release)
+        except RuntimeError:
+            # The loop is already closed, nothing is left to admit
+            pass
+
+    async def run(self, fn: Callable, *args) -> Any:
+        if self.pending >= self.max_pending:
+            self.rejected += 1
+            raise PoolSaturatedError(self.name)
+        loop = asyncio.get_running_loop()
+        self.pending += 1
+        try:
+            job = self._get_executor().submit(fn, *args)
+        except BaseException:
+            self._release()
+            raise
+        # The slot is held until the job itself finishes, not until the caller stops waiting:
+        # a timed out job keeps its worker busy and must keep counting against max_pending
+        job.add_done_callback(lambda _: self._release_from_worker(loop))
+        try:
+            result = await asyncio.wait_for(asyncio.wrap_future(job), self.timeout)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            raise
+        self.completed += 1
+        return result
+
+    def map(self, fn: Callable, iterable: Iterable, chunksize: int = 1) -> list:
+        """Blocking parallel map for scripts such as the seeder."""
+        return list(self._get_executor().map(fn, iterable, chunksize=chunksize))
+
+    def stats(self) -> dict:
+        return {
+            "max_workers": self.max_workers,
+            "max_pending": self.max_pending,
+            "timeout_seconds": self.timeout,
+            "pending": self.pending,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "timeouts": self.timeouts,
+        }
@@ -0,0 +1,275 @@
+import asyncio
+import heapq
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, OrderedDict
+from types import CodeType, FrameType
+from typing import Optional
+from fastapi import HTTPException
+from auth.dependencies import get_current_user, require_role
+from log.middleware import route_template
+
+# Seconds between stack samples of a profiled request
+PROFILE_INTERVAL = float(os.getenv("PROFILE_INTERVAL_MS", "5")) / 1000
+# Profiles requested with the header that are kept for retrieval, oldest dropped first
+PROFILE_STORE_SIZE = int(os.getenv("PROFILE_STORE_SIZE", "50"))
+# Fraction of all requests profiled in the background (0 disables it), of which the slowest are kept
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_KEEP_SLOWEST = int(os.getenv("PROFILE_KEEP_SLOWEST", "10"))
+PROFILE_HEADER = "X-Profile"
+PROFILE_ID_HEADER = "X-Profile-ID"
+
+_labels: dict[CodeType, str] = {}
+
+def _frame_label(code: CodeType) -> str:
+    label = _labels.get(code)
+    if label is None:
+        filename = code.co_filename
+        if filename.startswith(os.getcwd()):
+            filename = os.path.relpath(filename)
+        label = _labels[code] = f"{code.co_qualname} ({filename}:{code.co_firstlineno})"
+    return label
+
+def _frame_stack(frame: Optional[FrameType]) -> list[str]:
+    stack = []
+    while frame is not None:
+        stack.append(_frame_label(frame.f_code))
+        frame = frame.f_back
+    stack.reverse()
+    return stack
+
+def _await_stack(task: asyncio.Task) -> list[str]:
+    """Where a suspended task is waiting: its chain of coroutine frames, ending in what it awaits."""
+    stack = []
+    awaitable = task.get_coro()
+    while awaitable is not None:
+        frame = getattr(awaitable, "cr_frame", None) or getattr(awaitable, "gi_frame", None)
+        if frame is None:
+            break
+        stack.append(_frame_label(frame.f_code))
+        next_awaitable = getattr(awaitable, "cr_await", None) or getattr(awaitable, "gi_yieldfrom", None)
+        if next_awaitable is None or not hasattr(next_awaitable, "cr_frame") and not hasattr(next_awaitable, "gi_frame"):
+            stack.append(f"[await {type(next_awaitable).__name__}]" if next_awaitable is not None else "[await]")
+            break
+        awaitable = next_awaitable
+    return stack
+
+class Profile:
+    """Folded stacks sampled while one request was served.
+
+    Samples taken while the request's task runs on the event loop hold the
+    thread's full stack. Samples taken while it is suspended hold the await
+    chain, so time spent waiting on Postgres, Redis, the catalog or a worker
+    thread shows up under the await point.
+    """
+
+    def __init__(self, method: str, path: str, request_id: Optional[str], task: asyncio.Task, mode: str):
+        self.id = uuid.uuid4().hex
+        self.method = method
+        self.path = path
+        self.request_id = request_id
+        self.mode = mode
+        self.task = task
+        self.route: Optional[str] = None
+        self.status: Optional[int] = None
+        self.started_at = time.time()
+        self.duration_ms = 0.0
+        self.samples = 0
+        self.stacks: Counter[str] = Counter()
+
+    def add(self, stack: list[str]):
+        self.samples += 1
+        self.stacks[";".join(stack)] += 1
+
+    def folded(self) -> str:
+        """Brendan Gregg's folded format, the input of flamegraph.pl and speedscope."""
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+    def call_tree(self) -> dict:
+        root = {"name": "root", "samples": self.samples, "children": {}}
+        for stack, count in self.stacks.items():
+            node = root
+            for name in stack.split(";"):
+                node = node["children"].setdefault(name, {"name": name, "samples": 0, "children": {}})
+                node["samples"] += count
+
+        def shape(node):
+            children = sorted(node["children"].values(), key=lambda child: child["samples"], reverse=True)
+            return {"name": node["name"], "samples": node["samples"], "children": [shape(child) for child in children]}
+        return shape(root)
+
+    def summary(self) -> dict:
+        return {
+            "id": self.id,
+            "mode": self.mode,
+            "method": self.method,
+            "path": self.path,
+            "route": self.route,
+            "status": self.status,
+            "request_id": self.request_id,
+            "started_at": self.started_at,
+            "duration_ms": self.duration_ms,
+            "samples": self.samples,
+            "interval_ms": PROFILE_INTERVAL * 1000,
+        }
+
+class ProfileStore:
+    """Requested profiles by recency, background profiles by duration (only the slowest kept)."""
+
+    def __init__(self, size: int = PROFILE_STORE_SIZE, keep_slowest: int = PROFILE_KEEP_SLOWEST):
+        self.size = size
+        self.keep_slowest = keep_slowest
+        self._requested: OrderedDict[str, Profile] = OrderedDict()
+        # Min-heap of (duration, id, profile): the fastest kept profile is the one replaced
+        self._slowest: list[tuple[float, str, Profile]] = []
+
+    def add(self, profile: Profile):
+        if profile.mode == "requested":
+            self._requested[profile.id] = profile
+            if len(self._requested) > self.size:
+                self._requested.popitem(last=False)
+        elif len(self._slowest) < self.keep_slowest:
+            heapq.heappush(self._slowest, (profile.duration_ms, profile.id, profile))
+        elif self._slowest and profile.duration_ms > self._slowest[0][0]:
+            heapq.heapreplace(self._slowest, (profile.duration_ms, profile.id, profile))
+
+    def get(self, profile_id: str) -> Optional[Profile]:
+        profile = self._requested.get(profile_id)
+        if profile is None:
+            profile = next((profile for _, kept_id, profile in self._slowest if kept_id == profile_id), None)
+        return profile
+
+    def list(self) -> dict:
+        return {
+            "requested": [profile.summary() for profile in reversed(self._requested.values())],
+            "slowest": [profile.summary() for _, _, profile in sorted(self._slowest, reverse=True)],
+        }
+
+class SamplingProfiler:
+    """Samples the event loop thread from a background thread, for the requests being profiled.
+
+    The thread only wakes up while at least one profile is active, so the
+    cost when nobody profiles is zero.
+    """
+
+    def __init__(self, interval: float = PROFILE_INTERVAL):
+        self.interval = interval
+        self._active: dict[str, Profile] = {}
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread_id: Optional[int] = None
+
+    def _ensure_thread(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+            self._thread.start()
+
+    def begin(self, profile: Profile):
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread_id = threading.get_ident()
+        with self._lock:
+            self._active[profile.id] = profile
+        self._ensure_thread()
+        self._wakeup.set()
+
+    def end(self, profile: Profile):
+        with self._lock:
+            self._active.pop(profile.id, None)
+
+    def _sample(self):
+        with self._lock:
+            if not self._active:
+                return
+            running = asyncio.current_task(self._loop)
+            running_stack = None
+            for profile in self._active.values():
+                if profile.task is running:
+                    if running_stack is None:
+                        running_stack = _frame_stack(sys._current_frames().get(self._loop_thread_id))
+                    profile.add(running_stack)
+                else:
+                    profile.add(_await_stack(profile.task))
+
+    def _run(self):
+        while True:
+            if not self._active:
+                self._wakeup.clear()
+                self._wakeup.wait()
+            time.sleep(self.interval)
+            try:
+                self._sample()
+            except Exception:
+                # A stack that changed under us is skipped, the next sample will be consistent
+                pass
+
+_require_admin = require_role("admin")
+
+async def _is_admin(headers: list[tuple[bytes, bytes]]) -> bool:
+    authorization = next((value.decode("latin-1") for name, value in headers if name == b"authorization"), "")
+    scheme, _, token = authorization.partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return False
+    try:
+        _require_admin(await get_current_user(token))
+    except HTTPException:
+        return False
+    return True
+
+class ProfilingMiddleware:
+    """Profiles requests sent by an admin with `X-Profile: 1`, plus a PROFILE_SAMPLE_RATE share of all requests.
+
+    The profile id is returned in X-Profile-ID; profiles are read back from
+    /api/admin/profiles.
+    """
+
+    def __init__(self, app, profiler: "SamplingProfiler | None" = None, store: "ProfileStore | None" = None, sample_rate: float = PROFILE_SAMPLE_RATE):
+        self.app = app
+        self.profiler = profiler or request_profiler
+        self.store = store or profile_store
+        self.sample_rate = sample_rate
+        self._header = PROFILE_HEADER.lower().encode()
+        self._id_header = PROFILE_ID_HEADER.lower().encode()
+
+    async def _mode(self, scope) -> Optional[str]:
+        requested = next((value for name, value in scope["headers"] if name == self._header), None)
+        if requested not in (None, b"", b"0", b"false") and await _is_admin(scope["headers"]):
+            return "requested"
+        if self.sample_rate > 0 and random.random() < self.sample_rate:
+            return "sampled"
+        return None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        mode = await self._mode(scope)
+        if mode is None:
+            return await self.app(scope, receive, send)
+
+        profile = Profile(scope["method"], scope["path"], scope.get("state", {}).get("request_id"), asyncio.current_task(), mode)
+
+        async def send_with_profile_id(message):
+            if message["type"] == "http.response.start":
+                profile.status = message["status"]
+                if mode == "requested":
+                    message["headers"] = [*message.get("headers", []), (self._id_header, profile.id.encode())]
+            await send(message)
+
+        start = time.perf_counter()
+        self.profiler.begin(profile)
+        try:
+            await self.app(scope, receive, send_with_profile_id)
+        finally:
+            self.profiler.end(profile)
+            profile.duration_ms = round((time.perf_counter() - start) * 1000, 2)
+            profile.route = route_template(scope)
+            profile.task = None
+            self.store.add(profile)
+
+request_profiler = SamplingProfiler()
+profile_store = ProfileStore()
@@ -0,0 +1,158 @@
+import asyncio
+import hashlib
+import json
+import os
+import re
+import tempfile
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional
+from log.logger import logger
+
+# Base directory; the cache keeps its files in a "reports" subdirectory of it. Empty means the default
+REPORT_CACHE_DIR = os.getenv("REPORT_CACHE_DIR") or os.path.join(tempfile.gettempdir(), "storeapi")
+REPORT_CACHE_MAX_BYTES = int(os.getenv("REPORT_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+# Bump when report layouts change so previously cached files and ETags stop matching
+REPORT_VERSION = 1
+# Names of cache files, see ReportCache.key; nothing else in the directory is read or deleted
+_KEY_PATTERN = re.compile(r"\d+-[a-z]+-[0-9a-f]{64}")
+
+def report_fingerprint(order_id: int, fmt: str, products: list[dict], status: Optional[str] = None) -> str:
+    """Content hash of everything a report is rendered from."""
+    payload = json.dumps(
+        {"v": REPORT_VERSION, "id": order_id, "fmt": fmt, "products": products, "status": status},
+        sort_keys=True, separators=(",", ":"), default=str,
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+class ReportCache:
+    """Size-bounded LRU cache of rendered reports on local disk.
+
+    Files are named `<order_id>-<format>-<fingerprint>`, so a changed order
+    never hits a stale file, and invalidating an order removes its files by
+    prefix. Workers sharing the directory each keep their own LRU view; a
+    file evicted by another worker is simply a miss. Files not named like a
+    key are never adopted or deleted.
+    """
+
+    def __init__(self, directory: str = REPORT_CACHE_DIR, max_bytes: int = REPORT_CACHE_MAX_BYTES):
+        self.directory = Path(directory) / "reports"
+        self.max_bytes = max_bytes
+        self._entries: OrderedDict[str, int] = OrderedDict()
+        self._size = 0
+        self._loaded = False
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _load(self):
+        # Adopt files left by earlier runs, least recently used first
+        self.directory.mkdir(parents=True, exist_ok=True)
+        files = sorted((p for p in self.directory.iterdir() if p.is_file() and _KEY_PATTERN.fullmatch(p.name)), key=lambda p: p.stat().st_atime)
+        for path in files:
+            self._entries[path.name] = path.stat().st_size
+            self._size += path.stat().st_size
+        self._loaded = True
+        self._evict()
+
+    @staticmethod
+    def key(order_id: int, fmt: str, fingerprint: str) -> str:
+        return f"{order_id}-{fmt}-{fingerprint}"
+
+    def _read(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            return self._read_locked(key)
+
+    def _read_locked(self, key: str) -> Optional[bytes]:
+        if not self._loaded:
+            self._load()
+        try:
+            content = (self.directory / key).read_bytes()
+        except FileNotFoundError:
+            self._forget(key)
+            return None
+        if key not in self._entries:
+            # Written by another worker sharing the directory
+            self._entries[key] = len(content)
+            self._size += len(content)
+        self._entries.move_to_end(key)
+        return content
+
+    def _write(self, key: str, content: bytes):
+        with self._lock:
+            self._write_locked(key, content)
+
+    def _write_locked(self, key: str, content: bytes):
+        if not self._loaded:
+            self._load()
+        if len(content) > self.max_bytes:
+            return
+        tmp = self.directory / f".{key}.{os.getpid()}.tmp"
+        tmp.write_bytes(content)
+        os.replace(tmp, self.directory / key)
+        self._forget(key)
+        self._entries[key] = len(content)
+        self._size += len(content)
+        self._evict()
+
+    def _unlink(self, key: str):
+        if _KEY_PATTERN.fullmatch(key):
+            (self.directory / key).unlink(missing_ok=True)
+
+    def _forget(self, key: str):
+        size = self._entries.pop(key, None)
+        if size is not None:
+            self._size -= size
+
+    def _evict(self):
+        while self._size > self.max_bytes and self._entries:
+            key, size = self._entries.popitem(last=False)
+            self._size -= size
+            self.evictions += 1
+            self._unlink(key)
+
+    def _invalidate(self, order_id: int):
+        with self._lock:
+            self._invalidate_locked(order_id)
+
+    def _invalidate_locked(self, order_id: int):
+        if not self._loaded:
+            self._load()
+        prefix = f"{order_id}-"
+        for key in [k for k in self._entries if k.startswith(prefix)]:
+            self._forget(key)
+            self._unlink(key)
+
+    # Disk access runs in a thread, callers are on the event loop
+
+    async def get(self, key: str) -> Optional[bytes]:
+        content = await asyncio.to_thread(self._read, key)
+        if content is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return content
+
+    async def put(self, key: str, content: bytes):
+        try:
+            await asyncio.to_thread(self._write, key, content)
+        except OSError as e:
+            logger.warning(f"Could not cache report {key}: {e}")
+
+    async def invalidate(self, order_id: int):
+        await asyncio.to_thread(self._invalidate, order_id)
+
+    def stats(self) -> dict:
+        return {
+            "directory": str(self.directory),
+            "entries": len(self._entries),
+            "bytes": self._size,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+report_cache = ReportCache()
@@ -0,0 +1,111 @@
+import asyncio
+import hashlib
+import os
+import time
+from types import MappingProxyType
+from typing import Optional
+from redis.exceptions import RedisError
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from auth.redis_client import get_redis, get_sync_redis, timed
+from log.logger import logger
+from models.status import Status, StatusRead
+
+STATUS_VERSION_KEY = os.getenv("STATUS_VERSION_KEY", "status:version")
+# Seconds between checks of the shared version counter, the most a worker serves stale statuses
+STATUS_VERSION_CHECK_INTERVAL = float(os.getenv("STATUS_VERSION_CHECK_INTERVAL", "5"))
+
+class StatusSnapshot:
+    """Immutable view of the status table, by id and by name."""
+
+    def __init__(self, statuses: list[StatusRead], version: Optional[str]):
+        self.statuses = tuple(statuses)
+        self.by_id = MappingProxyType({status.id: status for status in self.statuses})
+        self.by_name = MappingProxyType({status.name: status for status in self.statuses})
+        self.version = version
+        self.loaded_at = time.time()
+        # Content hash, the same in every worker holding the same statuses
+        content = "\n".join(status.model_dump_json() for status in self.statuses)
+        self.etag = hashlib.sha1(content.encode()).hexdigest()[:16]
+
+class StatusCache:
+    """Process-local snapshot of the statuses, shared by every request.
+
+    Writes bump a version counter in Redis and drop the local snapshot; other
+    workers compare the counter at most every STATUS_VERSION_CHECK_INTERVAL
+    seconds and reload when it moved. Without Redis each worker keeps its
+    snapshot until its own next write.
+    """
+
+    def __init__(self, check_interval: float = STATUS_VERSION_CHECK_INTERVAL):
+        self.check_interval = check_interval
+        self._snapshot: Optional[StatusSnapshot] = None
+        self._checked_at = 0.0
+        self._lock = asyncio.Lock()
+        self.loads = 0
+        self.version_checks = 0
+
+    async def _remote_version(self) -> Optional[str]:
+        try:
+            async with timed("status_version"):
+                return await get_redis().get(STATUS_VERSION_KEY)
+        except RedisError as e:
+            logger.warning(f"Redis error while reading the status version: {e}")
+            return self._snapshot.version if self._snapshot else None
+
+    async def load(self, session: AsyncSession) -> StatusSnapshot:
+        # Version first: a write landing during the query leaves the snapshot behind, to be reloaded
+        version = await self._remote_version()
+        statuses = (await session.exec(select(Status).order_by(Status.id))).all()
+        self._snapshot = StatusSnapshot([StatusRead.model_validate(status) for status in statuses], version)
+        self._checked_at = time.monotonic()
+        self.loads += 1
+        return self._snapshot
+
+    async def get(self, session: AsyncSession) -> StatusSnapshot:
+        snapshot = self._snapshot
+        if snapshot is not None and time.monotonic() - self._checked_at < self.check_interval:
+            return snapshot
+
+        async with self._lock:
+            if self._snapshot is None:
+                return await self.load(session)
+            if time.monotonic() - self._checked_at >= self.check_interval:
+                self.version_checks += 1
+                if await self._remote_version() != self._snapshot.version:
+                    return await self.load(session)
+                self._checked_at = time.monotonic()
+            return self._snapshot
+
+    def _drop(self):
+        self._snapshot = None
+
+    async def invalidate(self):
+        """Called after every status write: reload here now, everywhere else within the check interval."""
+        self._drop()
+        try:
+            async with timed("status_version_bump"):
+                await get_redis().incr(STATUS_VERSION_KEY)
+        except RedisError as e:
+            logger.warning(f"Redis error while bumping the status version: {e}")
+
+    def invalidate_sync(self):
+        """invalidate() for the sync CRUD functions used by scripts."""
+        self._drop()
+        try:
+            get_sync_redis().incr(STATUS_VERSION_KEY)
+        except RedisError as e:
+            logger.warning(f"Redis error while bumping the status version: {e}")
+
+    def stats(self) -> dict:
+        snapshot = self._snapshot
+        return {
+            "loaded": snapshot is not None,
+            "statuses": len(snapshot.statuses) if snapshot else 0,
+            "version": snapshot.version if snapshot else None,
+            "loaded_at": snapshot.loaded_at if snapshot else None,
+            "loads": self.loads,
+            "version_checks": self.version_checks,
+        }
+
+status_cache = StatusCache()
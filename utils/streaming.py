@@ -0,0 +1,31 @@
+import os
+import orjson
+from fastapi import Request
+from fastapi.responses import StreamingResponse
+from db.database import async_session_maker
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+# Rows fetched per round-trip from the server-side cursor, and encoded per chunk
+STREAM_BATCH_SIZE = int(os.getenv("STREAM_BATCH_SIZE", "1000"))
+
+def wants_ndjson(request: Request) -> bool:
+    return NDJSON_MEDIA_TYPE in request.headers.get("accept", "")
+
+def stream_ndjson(statement, model) -> StreamingResponse:
+    """Stream every row of `statement` as one JSON object per line.
+
+    Rows are read through a server-side cursor as plain table columns, without
+    building ORM objects, and each batch is encoded and flushed before the
+    next one is fetched, so memory does not grow with the result size. The
+    stream has its own session because request-scoped ones close before the
+    body is sent.
+    """
+    statement = statement.with_only_columns(*model.__table__.columns).execution_options(yield_per=STREAM_BATCH_SIZE)
+
+    async def lines():
+        async with async_session_maker() as session:
+            result = await session.stream(statement)
+            async for rows in result.mappings().partitions():
+                yield b"".join(orjson.dumps(dict(row), option=orjson.OPT_APPEND_NEWLINE) for row in rows)
+
+    return StreamingResponse(lines(), media_type=NDJSON_MEDIA_TYPE)